@@ -1,15 +1,163 @@
 # scripts/clean_data.py
+import numpy as np
 import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from dataset_io import RAW_REVIEWS, CLEANED_REVIEWS, read_dataset, write_dataset
 
-def clean_review_data():
-    # Load the scraped data
-    df = pd.read_csv('data/bank_reviews.csv')
+SHINGLE_SIZE = 5           # bytes per character shingle
+NUM_PERM = 64              # MinHash permutations
+LSH_BANDS = 16             # bands x rows must equal NUM_PERM
+NEAR_DUP_THRESHOLD = 0.8   # estimated Jaccard similarity to count as a near-duplicate
+HASH_CHUNK = 100000        # reviews hashed at a time (bounds shingle memory)
+
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+def normalize_reviews(reviews):
+    """Vectorized normalization: lowercase, drop emoji/punctuation, collapse whitespace"""
+    # One regex pass: every run of non-word characters (spaces included) becomes a space
+    return (reviews.fillna('').astype(str).str.lower()
+            .str.replace(r'\W+', ' ', regex=True)
+            .str.strip())
+
+def exact_duplicates(df, normalized=None):
+    """
+    Mark repeats of a review within its bank, ignoring case, whitespace,
+    punctuation and emoji. Reviews made only of emoji/symbols normalize to ""
+    and are compared on their raw text instead, so "👍" and "😡" both stay.
+    """
+    if normalized is None:
+        normalized = normalize_reviews(df['review'])
+    keys = normalized.mask(normalized == '', df['review'].fillna('').astype(str).str.strip())
+    return pd.DataFrame({'text': keys, 'bank': df['bank']}).duplicated()
+
+def _permutations(num_perm=NUM_PERM, seed=42):
+    """Odd multipliers and offsets of the uint32 hash permutations (a * x + b mod 2**32)"""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 2**32, size=num_perm, dtype=np.uint32) | np.uint32(1)
+    b = rng.integers(0, 2**32, size=num_perm, dtype=np.uint32)
+    return a, b
+
+def minhash_signatures(texts, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, chunk_size=HASH_CHUNK):
+    """
+    MinHash signature (num_perm uint32 values) of each text's byte shingles.
+    Shingle hashes are computed with numpy over one byte buffer per chunk;
+    texts shorter than a shingle are padded, empty texts get all-max signatures.
+    """
+    a, b = _permutations(num_perm)
+    signatures = np.full((len(texts), num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+    pad = '\x00' * (shingle_size - 1)
+    
+    for start in range(0, len(texts), chunk_size):
+        chunk = [t.encode('utf-8') for t in texts[start:start + chunk_size]]
+        lengths = np.fromiter((len(t) for t in chunk), dtype=np.int64, count=len(chunk))
+        nonempty = np.flatnonzero(lengths)
+        if not len(nonempty):
+            continue
+        
+        # One buffer: every text followed by shingle_size - 1 padding bytes,
+        # so no shingle spans two texts
+        blob = np.frombuffer(pad.encode().join(chunk[i] for i in nonempty) + pad.encode(),
+                             dtype=np.uint8).astype(np.uint64)
+        n_shingles = len(blob) - shingle_size + 1
+        hashes = np.zeros(n_shingles, dtype=np.uint64)
+        for j in range(shingle_size):
+            hashes = hashes * np.uint64(257) + blob[j:j + n_shingles]
+        
+        # Keep the shingles that start inside a text (one per text byte)
+        text_lengths = lengths[nonempty]
+        text_starts = np.concatenate(([0], np.cumsum(text_lengths + shingle_size - 1)[:-1]))
+        positions = np.repeat(text_starts - np.concatenate(([0], np.cumsum(text_lengths)[:-1])),
+                              text_lengths) + np.arange(text_lengths.sum())
+        hashes = hashes[positions]
+        hashes = (hashes ^ (hashes >> np.uint64(32))).astype(np.uint32)
+        segment_starts = np.concatenate(([0], np.cumsum(text_lengths)[:-1]))
+        
+        # uint32 arithmetic in a reused buffer: half the memory traffic of uint64
+        rows = start + nonempty
+        permuted = np.empty_like(hashes)
+        for p in range(num_perm):
+            np.multiply(hashes, a[p], out=permuted)
+            np.add(permuted, b[p], out=permuted)
+            signatures[rows, p] = np.minimum.reduceat(permuted, segment_starts)
+    
+    return signatures
+
+def near_duplicate_groups(signatures, groups=None, bands=LSH_BANDS, threshold=NEAR_DUP_THRESHOLD):
+    """
+    Cluster near-duplicates with LSH banding: reviews sharing any band bucket
+    (within the same group, e.g. bank) become candidates, candidates whose
+    signature agreement reaches the threshold are linked, and connected
+    components form the clusters. Returns each review's cluster label.
+    """
+    n, num_perm = signatures.shape
+    rows_per_band = num_perm // bands
+    groups = np.zeros(n, dtype=np.uint64) if groups is None else np.asarray(groups, dtype=np.uint64)
+    empty = (signatures == np.iinfo(np.uint32).max).all(axis=1)
+    
+    sources, targets = [], []
+    for band in range(bands):
+        keys = groups.copy()
+        for col in range(band * rows_per_band, (band + 1) * rows_per_band):
+            keys = keys * _MIX + signatures[:, col].astype(np.uint64)
+        
+        # Link every bucket member to the bucket's first review (linear, not all pairs)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        run_start = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+        representative = order[np.flatnonzero(run_start)[np.cumsum(run_start) - 1]]
+        linked = (representative != order) & ~empty[order]
+        sources.append(order[linked])
+        targets.append(representative[linked])
+    
+    sources = np.concatenate(sources)
+    targets = np.concatenate(targets)
+    
+    # Verify candidates (drops bucket collisions and low-similarity matches)
+    similarity = np.empty(len(sources))
+    for start in range(0, len(sources), HASH_CHUNK):
+        end = start + HASH_CHUNK
+        similarity[start:end] = (signatures[sources[start:end]] ==
+                                 signatures[targets[start:end]]).mean(axis=1)
+    keep = similarity >= threshold
+    
+    graph = coo_matrix((np.ones(keep.sum(), dtype=np.int8), (sources[keep], targets[keep])),
+                       shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    return labels
+
+def flag_near_duplicates(df, threshold=NEAR_DUP_THRESHOLD, normalized=None):
+    """Mark every review but the first of each near-duplicate cluster (per bank)"""
+    if normalized is None:
+        normalized = normalize_reviews(df['review'])
+    signatures = minhash_signatures(normalized.tolist())
+    bank_codes = df['bank'].astype('category').cat.codes.to_numpy()
+    labels = near_duplicate_groups(signatures, groups=bank_codes, threshold=threshold)
+    
+    # The earliest review in each cluster is the one kept
+    position = np.arange(len(df))
+    first = np.full(labels.max() + 1 if len(labels) else 0, len(df))
+    np.minimum.at(first, labels, position)
+    return pd.Series(first[labels] != position, index=df.index)
+
+def compact_dtypes(df):
+    """Smallest dtypes that hold the data: int8 ratings (nullable if missing)"""
+    if 'rating' in df:
+        rating = pd.to_numeric(df['rating'], errors='coerce')
+        df['rating'] = rating.astype('int8') if rating.notna().all() else rating.astype('Int8')
+    return df
+
+def clean_review_data(df=None, near_duplicates='drop'):
+    # Load the scraped data (dates parsed, bank/source as categoricals)
+    if df is None:
+        df = read_dataset(RAW_REVIEWS)
     
     print(f"Original data: {len(df)} reviews")
     
-    # 1. Remove duplicates
+    # 1. Remove duplicates (ignoring case, whitespace, punctuation and emoji)
     initial_count = len(df)
-    df = df.drop_duplicates(subset=['review', 'bank'])
+    normalized = normalize_reviews(df['review'])
+    df = df[~exact_duplicates(df, normalized)]
     print(f"Removed {initial_count - len(df)} duplicate reviews")
     
     # 2. Handle missing data
@@ -22,12 +170,22 @@ def clean_review_data():
     print("\nMissing values after cleaning:")
     print(missing_after)
     
-    # 3. Ensure date format is consistent (already done in scraping, but double-check)
-    df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
+    # 3. Near-duplicates (MinHash/LSH): flag them or drop them
+    if near_duplicates != 'off':
+        is_near_dup = flag_near_duplicates(df, normalized=normalized.loc[df.index])
+        print(f"Found {is_near_dup.sum()} near-duplicate reviews")
+        if near_duplicates == 'drop':
+            df = df[~is_near_dup]
+        else:
+            df = df.assign(near_duplicate=is_near_dup)
+    
+    # 4. Compact dtypes; ensure date format is consistent (already done in scraping)
+    df = compact_dtypes(df.copy())
+    df['date'] = df['date'].dt.normalize()
     
-    # 4. Save cleaned data
-    cleaned_file = 'data/cleaned_bank_reviews.csv'
-    df.to_csv(cleaned_file, index=False)
+    # 5. Save cleaned data (Parquet partitioned by bank/month, plus the CSV that
+    # streaming sentiment analysis reads in chunks)
+    df = write_dataset(df, CLEANED_REVIEWS, csv=True)
     
     print(f"\nCleaned data saved: {len(df)} reviews")
     print("\nFinal count by bank:")
@@ -40,5 +198,16 @@ def clean_review_data():
     
     return df
 
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Clean scraped bank reviews')
+    parser.add_argument('--near-duplicates', choices=['drop', 'flag', 'off'], default='drop',
+                       help='Drop near-duplicate reviews, flag them in a near_duplicate '
+                            'column, or skip detection (default: drop)')
+    args = parser.parse_args()
+    
+    clean_review_data(near_duplicates=args.near_duplicates)
+
 if __name__ == "__main__":
-    clean_review_data()
\ No newline at end of file
+    main()
@@ -1,10 +1,58 @@
-import psycopg2
-from psycopg2 import sql
+try:
+    import psycopg2
+    from psycopg2 import sql
+    from psycopg2.extras import execute_values
+except ImportError:  # SQLite-only installs
+    psycopg2 = None
 import pandas as pd
+import hashlib
+import io
 import os
+import sqlite3
+import tempfile
+import time
+from dataset_io import SENTIMENT_REVIEWS, read_dataset
 
-def create_connection():
-    """Create connection to PostgreSQL"""
+REVIEW_COLUMNS = ['review_key', 'bank_id', 'review_text', 'rating', 'review_date',
+                  'sentiment_label', 'sentiment_score']
+BATCH_SIZE = 10000
+SQLITE_PATH = 'data/bank_reviews.db'
+
+# Per-backend SQL fragments for the statements both backends share; the
+# statements name them as {placeholders}
+SQL_FRAGMENTS = {
+    'postgres': {'serial_key': 'SERIAL PRIMARY KEY', 'cascade': ' CASCADE',
+                 'on_commit': ' ON COMMIT DELETE ROWS', 'numeric': '::numeric', 'param': '%s'},
+    'sqlite': {'serial_key': 'INTEGER PRIMARY KEY', 'cascade': '',
+               'on_commit': '', 'numeric': '', 'param': '?'},
+}
+
+def connection_backend(conn):
+    """'sqlite' or 'postgres' for an open connection"""
+    return 'sqlite' if isinstance(conn, sqlite3.Connection) else 'postgres'
+
+def backend_sql(query, conn):
+    """Fill a shared statement's {placeholders} with the connection backend's fragments"""
+    return query.format(**SQL_FRAGMENTS[connection_backend(conn)])
+
+def create_sqlite_connection(path=SQLITE_PATH):
+    """Create connection to a local SQLite database in WAL mode"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    print(f"✅ Connected to SQLite database {path}")
+    return conn
+
+def create_connection(backend='postgres', sqlite_path=SQLITE_PATH):
+    """Create connection to PostgreSQL (or SQLite with backend='sqlite')"""
+    if backend == 'sqlite':
+        return create_sqlite_connection(sqlite_path)
+    if psycopg2 is None:
+        print("❌ psycopg2 is not installed; use --backend sqlite")
+        return None
+    
     try:
         conn = psycopg2.connect(
             host="localhost",
@@ -23,26 +71,35 @@ def create_connection():
         print("3. Try default password 'postgres'")
         return None
 
-def create_tables(conn):
-    """Create database tables in PostgreSQL"""
-    commands = (
+def create_tables(conn, rebuild=False):
+    """Create database tables (kept across runs unless rebuild)"""
+    drop_commands = (
         """
-        DROP TABLE IF EXISTS reviews CASCADE;
+        DROP TABLE IF EXISTS review_daily_rollup{cascade};
         """,
         """
-        DROP TABLE IF EXISTS banks CASCADE;
+        DROP TABLE IF EXISTS load_watermarks{cascade};
         """,
         """
-        CREATE TABLE banks (
-            bank_id SERIAL PRIMARY KEY,
-            bank_name VARCHAR(100) NOT NULL,
+        DROP TABLE IF EXISTS reviews{cascade};
+        """,
+        """
+        DROP TABLE IF EXISTS banks{cascade};
+        """
+    )
+    commands = (
+        """
+        CREATE TABLE IF NOT EXISTS banks (
+            bank_id {serial_key},
+            bank_name VARCHAR(100) NOT NULL UNIQUE,
             app_name VARCHAR(100),
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
         """,
         """
-        CREATE TABLE reviews (
-            review_id SERIAL PRIMARY KEY,
+        CREATE TABLE IF NOT EXISTS reviews (
+            review_id {serial_key},
+            review_key CHAR(64) NOT NULL UNIQUE,
             bank_id INTEGER REFERENCES banks(bank_id),
             review_text TEXT NOT NULL,
             rating INTEGER CHECK (rating >= 1 AND rating <= 5),
@@ -50,35 +107,260 @@ def create_tables(conn):
             sentiment_label VARCHAR(20),
             sentiment_score DECIMAL(5,4),
             source VARCHAR(50) DEFAULT 'Google Play',
-            scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
         """,
         """
-        CREATE INDEX idx_reviews_bank_id ON reviews(bank_id);
+        CREATE TABLE IF NOT EXISTS load_watermarks (
+            bank_id INTEGER PRIMARY KEY REFERENCES banks(bank_id),
+            last_review_date DATE,
+            last_loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            rows_loaded INTEGER DEFAULT 0
+        );
         """,
         """
-        CREATE INDEX idx_reviews_sentiment ON reviews(sentiment_label);
+        CREATE TABLE IF NOT EXISTS review_daily_rollup (
+            bank_id INTEGER REFERENCES banks(bank_id),
+            review_day DATE,
+            rating INTEGER,
+            sentiment_label VARCHAR(20),
+            review_count INTEGER NOT NULL,
+            score_sum DOUBLE PRECISION NOT NULL
+        );
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_rollup_bank_day ON review_daily_rollup(bank_id, review_day);
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_reviews_bank_id ON reviews(bank_id);
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_reviews_sentiment ON reviews(sentiment_label);
         """,
         """
-        CREATE INDEX idx_reviews_date ON reviews(review_date);
+        CREATE INDEX IF NOT EXISTS idx_reviews_date ON reviews(review_date);
         """
     )
     
     try:
         cur = conn.cursor()
+        if rebuild:
+            for command in drop_commands:
+                cur.execute(backend_sql(command, conn))
         for command in commands:
-            cur.execute(command)
+            cur.execute(backend_sql(command, conn))
+        
+        # Tables from an older setup were created without the natural key
+        if connection_backend(conn) == 'sqlite':
+            cur.execute("PRAGMA table_info(reviews)")
+            has_key = any(row[1] == 'review_key' for row in cur.fetchall())
+        else:
+            cur.execute("""
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'reviews' AND column_name = 'review_key'
+            """)
+            has_key = cur.fetchone() is not None
+        if not has_key:
+            print("❌ Existing reviews table has no review_key; run once with --rebuild")
+            conn.rollback()
+            return False
+        
         conn.commit()
         cur.close()
-        print("✅ Tables created successfully")
+        print("✅ Tables ready")
         return True
     except Exception as e:
         print(f"❌ Error creating tables: {e}")
         conn.rollback()
         return False
 
-def insert_data(conn):
-    """Insert data into PostgreSQL"""
+def review_keys(df):
+    """Natural key per review: sha256 of bank, review text and date"""
+    if 'date' not in df:
+        dates = pd.Series('', index=df.index)
+    elif pd.api.types.is_datetime64_any_dtype(df['date']):
+        dates = df['date'].dt.strftime('%Y-%m-%d').fillna('')
+    else:
+        dates = df['date'].fillna('').astype(str)
+    return [
+        hashlib.sha256(f"{bank}\x00{text}\x00{date}".encode('utf-8')).hexdigest()
+        for bank, text, date in zip(df['bank'], df['review'].astype(str), dates)
+    ]
+
+def prepare_reviews(df, bank_map):
+    """Vectorized bank-id mapping, date parsing and defaults for bulk loading"""
+    reviews = pd.DataFrame({
+        'review_key': review_keys(df),
+        'bank_id': df['bank'].astype(object).map(bank_map),
+        'review_text': df['review'].astype(str).str[:5000],
+        'rating': pd.to_numeric(df['rating'], errors='coerce').astype('Int64'),
+        'review_date': (pd.to_datetime(df['date'], errors='coerce').dt.date
+                        if 'date' in df else None),
+        'sentiment_label': (df['sentiment_label'].astype(object) if 'sentiment_label' in df
+                            else 'NEUTRAL'),
+        'sentiment_score': df['sentiment_score'] if 'sentiment_score' in df else 0.5
+    }, index=df.index)
+    
+    # Reviews for unknown banks are skipped
+    reviews = reviews.dropna(subset=['bank_id'])
+    reviews['bank_id'] = reviews['bank_id'].astype(int)
+    return reviews[REVIEW_COLUMNS]
+
+def load_watermarks(cur):
+    """Newest review date already loaded, per bank_id"""
+    cur.execute("SELECT bank_id, last_review_date FROM load_watermarks")
+    return {bank_id: last_date for bank_id, last_date in cur.fetchall()}
+
+def filter_delta(reviews, watermarks):
+    """Keep reviews on or after each bank's watermark (same-day reviews may be new)"""
+    cutoff = pd.to_datetime(reviews['bank_id'].map(watermarks))
+    dates = pd.to_datetime(reviews['review_date'])
+    keep = cutoff.isna() | dates.isna() | (dates >= cutoff)
+    return reviews[keep]
+
+def copy_reviews(cur, batch, table='reviews_staging'):
+    """Stream one batch through COPY FROM STDIN"""
+    buffer = io.StringIO()
+    batch.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    # Unquoted empty fields are NULL; review_text must stay a (possibly empty) string
+    cur.copy_expert(
+        f"COPY {table} ({', '.join(REVIEW_COLUMNS)}) FROM STDIN "
+        "WITH (FORMAT csv, FORCE_NOT_NULL (review_text))",
+        buffer
+    )
+
+def values_reviews(cur, batch, table='reviews_staging'):
+    """Insert one batch with a multi-row VALUES statement"""
+    rows = batch.astype(object).where(batch.notna(), None).itertuples(index=False, name=None)
+    execute_values(
+        cur,
+        f"INSERT INTO {table} ({', '.join(REVIEW_COLUMNS)}) VALUES %s",
+        rows,
+        page_size=len(batch)
+    )
+
+def executemany_reviews(cur, batch, table='reviews_staging'):
+    """Insert one batch with executemany (SQLite)"""
+    batch = batch.assign(review_date=batch['review_date'].astype(str).where(
+        batch['review_date'].notna(), None))
+    rows = batch.astype(object).where(batch.notna(), None).itertuples(index=False, name=None)
+    placeholders = ', '.join('?' * len(REVIEW_COLUMNS))
+    cur.executemany(
+        f"INSERT INTO {table} ({', '.join(REVIEW_COLUMNS)}) VALUES ({placeholders})",
+        rows
+    )
+
+def upsert_reviews_sqlite(cur):
+    """SQLite version of upsert_reviews (no DISTINCT ON / xmax)"""
+    cur.execute("SELECT COUNT(*) FROM reviews")
+    before = cur.fetchone()[0]
+    # WHERE on the SELECT also keeps SQLite from parsing ON CONFLICT as a join
+    cur.execute("""
+        INSERT INTO reviews
+            (review_key, bank_id, review_text, rating, review_date,
+             sentiment_label, sentiment_score)
+        SELECT review_key, bank_id, review_text, rating, review_date,
+               sentiment_label, sentiment_score
+        FROM reviews_staging
+        WHERE rowid IN (SELECT MAX(rowid) FROM reviews_staging GROUP BY review_key)
+        ON CONFLICT (review_key) DO UPDATE SET
+            rating = excluded.rating,
+            sentiment_label = excluded.sentiment_label,
+            sentiment_score = excluded.sentiment_score,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE reviews.rating IS NOT excluded.rating
+           OR reviews.sentiment_label IS NOT excluded.sentiment_label
+           OR reviews.sentiment_score IS NOT excluded.sentiment_score
+    """)
+    written = cur.rowcount
+    cur.execute("SELECT COUNT(*) FROM reviews")
+    inserted = cur.fetchone()[0] - before
+    return inserted, written - inserted
+
+def upsert_reviews(cur):
+    """Merge staged rows into reviews, writing only new or changed ones"""
+    cur.execute("""
+        INSERT INTO reviews
+            (review_key, bank_id, review_text, rating, review_date,
+             sentiment_label, sentiment_score)
+        SELECT DISTINCT ON (review_key)
+            review_key, bank_id, review_text, rating, review_date,
+            sentiment_label, sentiment_score
+        FROM reviews_staging
+        ORDER BY review_key
+        ON CONFLICT (review_key) DO UPDATE SET
+            rating = EXCLUDED.rating,
+            sentiment_label = EXCLUDED.sentiment_label,
+            sentiment_score = EXCLUDED.sentiment_score,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE (reviews.rating, reviews.sentiment_label, reviews.sentiment_score)
+              IS DISTINCT FROM
+              (EXCLUDED.rating, EXCLUDED.sentiment_label, EXCLUDED.sentiment_score)
+        RETURNING (xmax = 0) AS inserted
+    """)
+    flags = [row[0] for row in cur.fetchall()]
+    inserted = sum(flags)
+    return inserted, len(flags) - inserted
+
+def update_watermarks(cur, reviews):
+    """Advance each loaded bank's watermark to its newest review date"""
+    dates = pd.to_datetime(reviews['review_date'])
+    latest = dates.groupby(reviews['bank_id']).agg(['max', 'size'])
+    rows = [(int(bank_id), None if pd.isna(last_date) else last_date.date(), int(count))
+            for bank_id, last_date, count in latest.itertuples(name=None)]
+    
+    if isinstance(cur, sqlite3.Cursor):
+        rows = [(bank_id, None if last_date is None else last_date.isoformat(), count)
+                for bank_id, last_date, count in rows]
+        # SQLite's scalar MAX() returns NULL if either side is NULL
+        cur.executemany("""
+            INSERT INTO load_watermarks (bank_id, last_review_date, rows_loaded)
+            VALUES (?, ?, ?)
+            ON CONFLICT (bank_id) DO UPDATE SET
+                last_review_date = MAX(
+                    COALESCE(load_watermarks.last_review_date, excluded.last_review_date),
+                    COALESCE(excluded.last_review_date, load_watermarks.last_review_date)),
+                last_loaded_at = CURRENT_TIMESTAMP,
+                rows_loaded = excluded.rows_loaded
+        """, rows)
+        return
+    
+    execute_values(cur, """
+        INSERT INTO load_watermarks (bank_id, last_review_date, rows_loaded)
+        VALUES %s
+        ON CONFLICT (bank_id) DO UPDATE SET
+            last_review_date = GREATEST(load_watermarks.last_review_date,
+                                        EXCLUDED.last_review_date),
+            last_loaded_at = CURRENT_TIMESTAMP,
+            rows_loaded = EXCLUDED.rows_loaded
+    """, rows)
+
+def refresh_rollup(cur, full=False):
+    """Recompute daily rollup rows for the (bank, day) pairs in the staging table"""
+    if full:
+        condition = "TRUE"
+    else:
+        condition = """
+            (bank_id, {day}) IN (SELECT DISTINCT bank_id, review_date FROM reviews_staging)
+            OR ({day} IS NULL AND bank_id IN
+                (SELECT bank_id FROM reviews_staging WHERE review_date IS NULL))
+        """
+    cur.execute("DELETE FROM review_daily_rollup WHERE "
+                + condition.format(day='review_day'))
+    cur.execute("""
+        INSERT INTO review_daily_rollup
+            (bank_id, review_day, rating, sentiment_label, review_count, score_sum)
+        SELECT bank_id, review_date, rating, sentiment_label,
+               COUNT(*), COALESCE(SUM(sentiment_score), 0)
+        FROM reviews
+        WHERE """ + condition.format(day='review_date') + """
+        GROUP BY bank_id, review_date, rating, sentiment_label
+    """)
+
+def insert_data(conn, method='copy', batch_size=BATCH_SIZE, full=False, df=None):
+    """Upsert reviews, touching only reviews past each bank's watermark"""
     # Insert banks
     banks = [
         ("Commercial Bank of Ethiopia", "CBE Mobile"),
@@ -91,56 +373,68 @@ def insert_data(conn):
         
         # Insert banks
         for bank_name, app_name in banks:
-            cur.execute(
-                "INSERT INTO banks (bank_name, app_name) VALUES (%s, %s) RETURNING bank_id",
+            cur.execute(backend_sql(
+                """INSERT INTO banks (bank_name, app_name) VALUES ({param}, {param})
+                   ON CONFLICT (bank_name) DO NOTHING""", conn),
                 (bank_name, app_name)
             )
-            bank_id = cur.fetchone()[0]
-            print(f"✅ Inserted {bank_name} with ID: {bank_id}")
         
         # Get bank mapping
         cur.execute("SELECT bank_name, bank_id FROM banks")
         bank_map = {row[0]: row[1] for row in cur.fetchall()}
+        print(f"✅ Banks: {bank_map}")
         
-        # Insert reviews
-        df = pd.read_csv('data/full_sentiment_analysis.csv')
-        print(f"\nInserting {len(df)} reviews...")
+        # Keep only the delta since the last load
+        if df is None:
+            df = read_dataset(SENTIMENT_REVIEWS, columns=['review', 'rating', 'date', 'bank',
+                                                          'sentiment_label', 'sentiment_score'])
+        reviews = prepare_reviews(df, bank_map)
+        if not full:
+            reviews = filter_delta(reviews, load_watermarks(cur))
         
-        insert_count = 0
-        for _, row in df.iterrows():
-            bank_id = bank_map.get(row['bank'])
-            if not bank_id:
-                continue
-            
-            # Handle date
-            review_date = None
-            if 'date' in row and pd.notna(row['date']):
-                try:
-                    review_date = pd.to_datetime(row['date'])
-                except:
-                    review_date = None
-            
-            cur.execute("""
-                INSERT INTO reviews 
-                (bank_id, review_text, rating, review_date, sentiment_label, sentiment_score)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (
-                bank_id,
-                str(row['review'])[:5000],
-                int(row['rating']),
-                review_date,
-                row.get('sentiment_label', 'NEUTRAL'),
-                float(row.get('sentiment_score', 0.5))
-            ))
-            insert_count += 1
-            
-            # Progress update
-            if insert_count % 500 == 0:
-                print(f"  Inserted {insert_count} reviews...")
+        sqlite = connection_backend(conn) == 'sqlite'
+        if sqlite:
+            method = 'executemany'
+        print(f"\nStaging {len(reviews)} of {len(df)} reviews "
+              f"({method}, {batch_size} per batch)...")
+        
+        # Stage, then merge in one statement so readers never see a partial table
+        cur.execute(backend_sql("""
+            CREATE TEMP TABLE IF NOT EXISTS reviews_staging (
+                review_key CHAR(64),
+                bank_id INTEGER,
+                review_text TEXT,
+                rating INTEGER,
+                review_date DATE,
+                sentiment_label VARCHAR(20),
+                sentiment_score DECIMAL(5,4)
+            ){on_commit}
+        """, conn))
+        cur.execute("DELETE FROM reviews_staging")
+        load_batch = {'copy': copy_reviews, 'values': values_reviews,
+                      'executemany': executemany_reviews}[method]
+        start = time.perf_counter()
+        staged = 0
+        for offset in range(0, len(reviews), batch_size):
+            batch = reviews.iloc[offset:offset+batch_size]
+            load_batch(cur, batch)
+            staged += len(batch)
+            print(f"  Staged {staged} reviews...")
         
+        inserted, updated = upsert_reviews_sqlite(cur) if sqlite else upsert_reviews(cur)
+        if len(reviews):
+            update_watermarks(cur, reviews)
+        
+        # Keep the reporting rollup current; backfill it if it was just created
+        cur.execute("SELECT COUNT(*) FROM (SELECT 1 FROM review_daily_rollup LIMIT 1) AS t")
+        refresh_rollup(cur, full=full or cur.fetchone()[0] == 0)
         conn.commit()
+        
+        elapsed = time.perf_counter() - start
         cur.close()
-        print(f"✅ Successfully inserted {insert_count} reviews")
+        print(f"✅ Upserted {staged} reviews in {elapsed:.2f}s "
+              f"({staged / max(elapsed, 1e-9):,.0f} rows/sec): "
+              f"{inserted} new, {updated} changed, {staged - inserted - updated} unchanged")
         return True
         
     except Exception as e:
@@ -149,42 +443,44 @@ def insert_data(conn):
         return False
 
 def run_queries(conn):
-    """Run test queries on PostgreSQL"""
+    """Run test queries on PostgreSQL or SQLite"""
     queries = {
-        "Total Reviews": "SELECT COUNT(*) FROM reviews",
+        "Total Reviews": "SELECT COALESCE(SUM(review_count), 0) FROM review_daily_rollup",
         "Reviews per Bank": """
-            SELECT b.bank_name, COUNT(r.review_id) as review_count
+            SELECT b.bank_name, COALESCE(SUM(d.review_count), 0) as review_count
             FROM banks b
-            LEFT JOIN reviews r ON b.bank_id = r.bank_id
+            LEFT JOIN review_daily_rollup d ON b.bank_id = d.bank_id
             GROUP BY b.bank_name
             ORDER BY review_count DESC
         """,
         "Average Rating per Bank": """
             SELECT b.bank_name, 
-                   ROUND(AVG(r.rating)::numeric, 2) as avg_rating,
-                   COUNT(r.review_id) as review_count
+                   ROUND((SUM(d.rating * d.review_count) * 1.0
+                          / NULLIF(SUM(CASE WHEN d.rating IS NOT NULL
+                                            THEN d.review_count END), 0)){numeric}, 2) as avg_rating,
+                   COALESCE(SUM(d.review_count), 0) as review_count
             FROM banks b
-            LEFT JOIN reviews r ON b.bank_id = r.bank_id
+            LEFT JOIN review_daily_rollup d ON b.bank_id = d.bank_id
             GROUP BY b.bank_name
             ORDER BY avg_rating DESC
         """,
         "Sentiment Analysis": """
             SELECT 
                 sentiment_label,
-                COUNT(*) as count,
-                ROUND(COUNT(*) * 100.0 / SUM(COUNT(*)) OVER(), 2) as percentage
-            FROM reviews
+                SUM(review_count) as count,
+                ROUND(SUM(review_count) * 100.0 / SUM(SUM(review_count)) OVER(), 2) as percentage
+            FROM review_daily_rollup
             GROUP BY sentiment_label
             ORDER BY count DESC
         """
     }
     
-    print("\n📊 POSTGRESQL TEST QUERIES:")
+    print(f"\n📊 {connection_backend(conn).upper()} TEST QUERIES:")
     try:
         cur = conn.cursor()
         for query_name, query in queries.items():
             print(f"\n{query_name}:")
-            cur.execute(query)
+            cur.execute(backend_sql(query, conn))
             results = cur.fetchall()
             for row in results:
                 print(f"  {row}")
@@ -192,35 +488,105 @@ def run_queries(conn):
     except Exception as e:
         print(f"❌ Query error: {e}")
 
-def main():
+def benchmark_backends(batch_size=BATCH_SIZE):
+    """Time a full load and the report queries on SQLite and PostgreSQL"""
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for backend in ('sqlite', 'postgres'):
+            conn = create_connection(backend, sqlite_path=os.path.join(tmp_dir, 'bench.db'))
+            if not conn:
+                continue
+            try:
+                if backend == 'postgres':
+                    # Separate schema so the benchmark never touches the real tables
+                    cur = conn.cursor()
+                    cur.execute("CREATE SCHEMA IF NOT EXISTS load_benchmark")
+                    cur.execute("SET search_path TO load_benchmark")
+                    conn.commit()
+                
+                start = time.perf_counter()
+                if not (create_tables(conn, rebuild=True)
+                        and insert_data(conn, batch_size=batch_size, full=True)):
+                    continue
+                load_time = time.perf_counter() - start
+                
+                start = time.perf_counter()
+                run_queries(conn)
+                timings[backend] = (load_time, time.perf_counter() - start)
+            finally:
+                if backend == 'postgres':
+                    conn.rollback()
+                    cur = conn.cursor()
+                    cur.execute("DROP SCHEMA IF EXISTS load_benchmark CASCADE")
+                    conn.commit()
+                conn.close()
+    
+    print("\n" + "=" * 60)
+    print("STORAGE BACKEND BENCHMARK")
+    print("=" * 60)
+    for backend, (load_time, query_time) in timings.items():
+        print(f"{backend:10s} load {load_time:8.2f}s   queries {query_time:8.3f}s")
+
+def setup_database(backend='postgres', sqlite_path=SQLITE_PATH, method='copy',
+                   batch_size=BATCH_SIZE, full=False, rebuild=False, df=None):
+    """Create tables, load the analyzed reviews and run the test queries"""
+    backend_name = 'SQLITE' if backend == 'sqlite' else 'POSTGRESQL'
     print("=" * 60)
-    print("POSTGRESQL DATABASE SETUP FOR BANK REVIEWS")
+    print(f"{backend_name} DATABASE SETUP FOR BANK REVIEWS")
     print("=" * 60)
     
-    conn = create_connection()
+    conn = create_connection(backend, sqlite_path=sqlite_path)
     if not conn:
-        return
+        return False
     
     try:
         # Create tables
-        if not create_tables(conn):
-            return
+        if not create_tables(conn, rebuild=rebuild):
+            return False
         
         # Insert data
-        if not insert_data(conn):
-            return
+        if not insert_data(conn, method=method, batch_size=batch_size, full=full, df=df):
+            return False
         
         # Run test queries
         run_queries(conn)
         
         print("\n" + "=" * 60)
-        print("✅ POSTGRESQL SETUP COMPLETED SUCCESSFULLY")
+        print(f"✅ {backend_name} SETUP COMPLETED SUCCESSFULLY")
         print("=" * 60)
+        return True
         
     finally:
         if conn:
             conn.close()
             print("✅ Database connection closed")
 
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Load analyzed reviews into PostgreSQL or SQLite')
+    parser.add_argument('--backend', choices=['postgres', 'sqlite'], default='postgres',
+                       help='Storage backend (default: postgres)')
+    parser.add_argument('--sqlite-path', type=str, default=SQLITE_PATH,
+                       help=f'SQLite database file (default: {SQLITE_PATH})')
+    parser.add_argument('--method', choices=['copy', 'values'], default='copy',
+                       help='Bulk load with COPY FROM STDIN or execute_values (default: copy)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                       help=f'Rows per load batch (default: {BATCH_SIZE})')
+    parser.add_argument('--full', action='store_true',
+                       help='Upsert every review, ignoring per-bank watermarks (e.g. after re-scoring)')
+    parser.add_argument('--rebuild', action='store_true',
+                       help='Drop and recreate all tables before loading')
+    parser.add_argument('--benchmark', action='store_true',
+                       help='Compare load and query time of SQLite and PostgreSQL, then exit')
+    args = parser.parse_args()
+    
+    if args.benchmark:
+        benchmark_backends(batch_size=args.batch_size)
+        return
+    
+    setup_database(backend=args.backend, sqlite_path=args.sqlite_path, method=args.method,
+                   batch_size=args.batch_size, full=args.full, rebuild=args.rebuild)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
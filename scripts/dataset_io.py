@@ -0,0 +1,118 @@
+# scripts/dataset_io.py
+import hashlib
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+# pyarrow is optional: without it every dataset is read and written as CSV only
+try:
+    import pyarrow  # noqa: F401
+except ImportError:
+    pyarrow = None
+
+RAW_REVIEWS = 'data/bank_reviews.csv'
+CLEANED_REVIEWS = 'data/cleaned_bank_reviews.csv'
+SENTIMENT_REVIEWS = 'data/full_sentiment_analysis.csv'
+
+CATEGORICAL_COLUMNS = ['bank', 'sentiment_label', 'source']
+PARTITION_COLUMNS = ['bank', 'month']
+
+def parquet_path(path):
+    """Parquet dataset directory stored next to a CSV path"""
+    return os.path.splitext(path)[0] + '.parquet'
+
+def review_digests(reviews):
+    """64-bit digest per (bank, review text), a stable key for a review across datasets"""
+    return np.array([
+        int.from_bytes(hashlib.sha256(f"{bank}\x00{text}".encode('utf-8')).digest()[:8], 'little')
+        for bank, text in zip(reviews['bank'].astype(str), reviews['review'].fillna('').astype(str))
+    ], dtype=np.uint64)
+
+def with_categoricals(df):
+    """Compact dtypes: repeated strings as categoricals, dates parsed once"""
+    df = df.copy()
+    for column in CATEGORICAL_COLUMNS:
+        if column in df and df[column].dtype != 'category':
+            df[column] = df[column].astype('category')
+        if column in df:
+            df[column] = df[column].cat.remove_unused_categories()
+    if 'date' in df and not pd.api.types.is_datetime64_any_dtype(df['date']):
+        df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    return df
+
+def parquet_schema(df):
+    """
+    Arrow schema for a Parquet part with fixed types for the known columns, so
+    every part of a dataset agrees whatever one chunk happens to hold (an
+    all-None sentiment_error column would otherwise be stored as type null)
+    """
+    dictionary = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    fixed = {'review': pyarrow.string(), 'rating': pyarrow.int8(), 'date': pyarrow.timestamp('ns'),
+             'sentiment_score': pyarrow.float64(), 'sentiment_error': pyarrow.string(),
+             'near_duplicate': pyarrow.bool_()}
+    fixed.update({column: dictionary for column in CATEGORICAL_COLUMNS
+                  if column not in PARTITION_COLUMNS})
+    inferred = pyarrow.Schema.from_pandas(df, preserve_index=False)
+    return pyarrow.schema([pyarrow.field(field.name, fixed.get(field.name, field.type))
+                           for field in inferred], metadata=inferred.metadata)
+
+def dataset_files(path, csv=False):
+    """Files write_dataset leaves: the Parquet copy, plus the CSV if asked for or without pyarrow"""
+    files = [path] if csv or pyarrow is None else []
+    return files + ([parquet_path(path)] if pyarrow is not None else [])
+
+def remove_dataset(path):
+    """Delete the Parquet copy of a dataset (the CSV is left to the caller)"""
+    if os.path.isdir(parquet_path(path)):
+        shutil.rmtree(parquet_path(path))
+
+def write_dataset(df, path, part=None, csv=False):
+    """
+    Store a dataset as Parquet partitioned by bank and month. The CSV is only
+    written when a reader needs it (csv=True) or without pyarrow, where it is
+    the only copy. Without part the dataset is replaced; with part the rows
+    are written as that numbered part file, so rewriting the same part is
+    idempotent.
+    """
+    df = with_categoricals(df)
+    if csv or pyarrow is None:
+        df.to_csv(path, index=False)
+    if pyarrow is None:
+        return df
+    
+    if part is None:
+        remove_dataset(path)
+        # A CSV left by an earlier run would no longer match the Parquet copy
+        if not csv and os.path.exists(path):
+            os.remove(path)
+    
+    # Partition values must be plain strings (no unused categories, no NaN)
+    partitioned = df.assign(
+        bank=df['bank'].astype(str),
+        month=df['date'].dt.strftime('%Y-%m').fillna('unknown')
+    )
+    partitioned.to_parquet(parquet_path(path), partition_cols=PARTITION_COLUMNS, index=False,
+                           schema=parquet_schema(partitioned),
+                           basename_template=f"part-{part or 0}-{{i}}.parquet")
+    return df
+
+def read_dataset(path, columns=None, banks=None):
+    """
+    Load a dataset with only the requested columns (and optionally banks),
+    from Parquet when available and from the CSV otherwise.
+    """
+    if pyarrow is not None and os.path.isdir(parquet_path(path)):
+        filters = [('bank', 'in', list(banks))] if banks else None
+        df = pd.read_parquet(parquet_path(path), columns=columns, filters=filters)
+        if 'month' in df and 'month' not in (columns or []):
+            df = df.drop(columns='month')
+    else:
+        # The bank column is read for the filter even when not requested
+        filter_only = bool(banks) and columns is not None and 'bank' not in columns
+        df = pd.read_csv(path, usecols=list(columns) + ['bank'] if filter_only else columns)
+        if banks:
+            df = df[df['bank'].isin(banks)].reset_index(drop=True)
+        if filter_only:
+            df = df.drop(columns='bank')
+    return with_categoricals(df)
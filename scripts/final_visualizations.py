@@ -1,34 +1,127 @@
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # headless: charts are rendered in worker processes
 import matplotlib.pyplot as plt
 import seaborn as sns
-from wordcloud import WordCloud
+from wordcloud import WordCloud, STOPWORDS as WORDCLOUD_STOPWORDS
 import numpy as np
+from scipy import sparse
 from datetime import datetime
+import os
+import sqlite3
+import time
 import warnings
+import multiprocessing
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataset_io import SENTIMENT_REVIEWS, read_dataset, review_digests
+from review_corpus import ReviewCorpus, write_corpus
+from pipeline_paths import (CHART_FORMATS, DEFAULT_DPI, DEFAULT_FORMAT, OUTPUT_DIR, TOKEN_STORE,
+                            chart_path)
+from token_store import load_token_store, rows_for_digests, token_counts
 warnings.filterwarnings('ignore')
 
 # Set style
 plt.style.use('seaborn-v0_8-darkgrid')
 sns.set_palette("husl")
 
-def load_data():
+TOKEN_PATTERN = r'\w\w+'   # words of two or more characters
+TOKEN_CHUNK = 50000        # reviews tokenized at a time (bounds token memory)
+# Common words left out of the top-words lists
+STOPWORDS = frozenset(['the', 'and', 'for', 'with', 'this', 'that', 'have', 'has',
+                       'was', 'were', 'are', 'is', 'be', 'been', 'not', 'but', 'very',
+                       'app', 'bank', 'cbe', 'boa'])
+
+def load_data(df=None):
     """Load and prepare data for visualization"""
-    # Load analyzed data
-    df = pd.read_csv('data/full_sentiment_analysis.csv')
+    # Load analyzed data (dates come back parsed)
+    if df is None:
+        df = read_dataset(SENTIMENT_REVIEWS, columns=['review', 'rating', 'date', 'bank',
+                                                      'sentiment_label', 'sentiment_score'])
+    else:
+        df = df.assign(date=pd.to_datetime(df['date'], errors='coerce'))
     
-    # Convert date
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
     df['month_year'] = df['date'].dt.to_period('M')
     
     return df
 
-def plot_sentiment_by_bank(df):
+def build_summary_cube(df):
+    """One pass over the reviews: counts and score sums per (bank, month, rating, sentiment)"""
+    cube = df.groupby([df['bank'], df['month_year'].rename('month'), df['rating'],
+                       df['sentiment_label']], dropna=False, observed=True
+                      )['sentiment_score'].agg(review_count='size', score_sum='sum').reset_index()
+    return cube
+
+def load_trend_cube(cube, db_path=None):
+    """
+    Monthly counts for the trend chart. Only with db_path are they read from
+    the SQLite daily rollup, and only if it holds the charted reviews (same
+    count per bank); otherwise the summary cube is used.
+    """
+    if not db_path:
+        return cube
+    if not os.path.exists(db_path):
+        print(f"⚠️ {db_path} not found; trends come from the charted reviews")
+        return cube
+    try:
+        with sqlite3.connect(db_path) as conn:
+            rollup = pd.read_sql_query("""
+                SELECT b.bank_name AS bank, substr(d.review_day, 1, 7) AS month,
+                       d.rating, d.sentiment_label,
+                       SUM(d.review_count) AS review_count, SUM(d.score_sum) AS score_sum
+                FROM review_daily_rollup d
+                JOIN banks b ON b.bank_id = d.bank_id
+                GROUP BY b.bank_name, month, d.rating, d.sentiment_label
+            """, conn)
+    except (sqlite3.Error, pd.errors.DatabaseError) as e:
+        print(f"⚠️ Cannot read the daily rollup from {db_path} ({e}); "
+              f"trends come from the charted reviews")
+        return cube
+    
+    # A sampled or newer sentiment run charts different reviews than were loaded
+    charted = cube.groupby('bank', observed=True)['review_count'].sum()
+    loaded = rollup.groupby('bank')['review_count'].sum()
+    if {str(bank): int(count) for bank, count in charted.items() if count} != \
+            {bank: int(count) for bank, count in loaded.items()}:
+        print(f"⚠️ Daily rollup in {db_path} holds {loaded.sum()} reviews, not the "
+              f"{charted.sum()} charted; trends come from the charted reviews")
+        return cube
+    
+    rollup['month'] = pd.PeriodIndex(rollup['month'], freq='M')
+    print(f"📊 Using daily rollup from {db_path} ({rollup['review_count'].sum()} reviews)")
+    return rollup
+
+def bank_summary(cube):
+    """Per-bank totals shared by the bank charts and the insights report"""
+    rated = cube['rating'].notna()
+    totals = cube.assign(
+        rated=cube['review_count'].where(rated, 0),
+        rating_sum=(cube['rating'].astype(float) * cube['review_count']).where(rated, 0),
+        five_star=cube['review_count'].where(cube['rating'] == 5, 0),
+        one_star=cube['review_count'].where(cube['rating'] == 1, 0),
+        positive=cube['review_count'].where(cube['sentiment_label'] == 'POSITIVE', 0),
+        negative=cube['review_count'].where(cube['sentiment_label'] == 'NEGATIVE', 0),
+    ).groupby('bank', observed=True)[['review_count', 'rated', 'rating_sum', 'five_star',
+                                       'one_star', 'positive', 'negative']].sum()
+    totals['avg_rating'] = totals['rating_sum'] / totals['rated']
+    return totals
+
+def rating_insights_from(summary):
+    """Rating insights per bank (average, 5/1-star shares, total reviews)"""
+    return {bank: {
+        'avg_rating': row['avg_rating'],
+        '5_star_pct': row['five_star'] / row['review_count'] * 100,
+        '1_star_pct': row['one_star'] / row['review_count'] * 100,
+        'total_reviews': int(row['review_count'])
+    } for bank, row in summary.iterrows()}
+
+def plot_sentiment_by_bank(cube, fmt=DEFAULT_FORMAT, dpi=DEFAULT_DPI):
     """Plot 1: Sentiment distribution by bank"""
     fig, axes = plt.subplots(1, 2, figsize=(15, 6))
     
     # Subplot 1: Sentiment percentage by bank
-    sentiment_pivot = pd.crosstab(df['bank'], df['sentiment_label'], 
-                                 normalize='index') * 100
+    sentiment_counts = cube.groupby(['bank', 'sentiment_label'], observed=True)['review_count'].sum().unstack(fill_value=0)
+    sentiment_pivot = sentiment_counts.div(sentiment_counts.sum(axis=1), axis=0) * 100
     
     sentiment_pivot.plot(kind='bar', ax=axes[0], width=0.8)
     axes[0].set_title('Sentiment Distribution by Bank', fontsize=14, fontweight='bold')
@@ -42,9 +135,11 @@ def plot_sentiment_by_bank(df):
         axes[0].bar_label(container, fmt='%.1f%%', padding=3)
     
     # Subplot 2: Average rating by bank
-    rating_by_bank = df.groupby('bank')['rating'].agg(['mean', 'count']).round(2)
+    summary = bank_summary(cube)
+    rating_by_bank = pd.DataFrame({'mean': summary['avg_rating'].round(2),
+                                   'count': summary['rated'].astype(int)})
     colors = ['#2E86AB', '#A23B72', '#F18F01']
-    bars = axes[1].bar(rating_by_bank.index, rating_by_bank['mean'], color=colors)
+    bars = axes[1].bar(rating_by_bank.index.astype(str), rating_by_bank['mean'], color=colors)
     axes[1].set_title('Average Rating by Bank', fontsize=14, fontweight='bold')
     axes[1].set_ylabel('Average Rating (1-5 stars)', fontsize=12)
     axes[1].set_xlabel('Bank', fontsize=12)
@@ -58,16 +153,17 @@ def plot_sentiment_by_bank(df):
                     ha='center', va='bottom', fontsize=10)
     
     plt.tight_layout()
-    plt.savefig('outputs/sentiment_rating_by_bank.png', dpi=300, bbox_inches='tight')
+    plt.savefig(chart_path('sentiment_rating_by_bank', fmt), dpi=dpi, bbox_inches='tight')
     plt.close()
     
     print("✅ Created: Sentiment & Rating by Bank")
     return rating_by_bank
 
-def plot_sentiment_trends(df):
+def plot_sentiment_trends(cube, fmt=DEFAULT_FORMAT, dpi=DEFAULT_DPI):
     """Plot 2: Sentiment trends over time"""
-    # Prepare monthly data
-    monthly_data = df.groupby(['month_year', 'sentiment_label']).size().unstack(fill_value=0)
+    # Prepare monthly data from the summary cube
+    monthly_data = cube.groupby(['month', 'sentiment_label'], observed=True)['review_count'].sum().unstack(fill_value=0)
+    monthly_data.index.name = 'month_year'
     monthly_data['total'] = monthly_data.sum(axis=1)
     monthly_data['negative_pct'] = (monthly_data.get('NEGATIVE', 0) / monthly_data['total'] * 100).round(1)
     
@@ -98,17 +194,77 @@ def plot_sentiment_trends(df):
                 fontsize=10, color='gray')
     
     plt.tight_layout()
-    plt.savefig('outputs/sentiment_trends.png', dpi=300, bbox_inches='tight')
+    plt.savefig(chart_path('sentiment_trends', fmt), dpi=dpi, bbox_inches='tight')
     plt.close()
     
     print("✅ Created: Sentiment Trends Over Time")
     return monthly_data
 
-def create_wordclouds(df):
+def count_tokens(reviews, chunk_size=TOKEN_CHUNK, store=None):
+    """
+    Word counts per (sentiment_label, bank, token), one vectorized pass over
+    the reviews (a DataFrame or a ReviewCorpus) in chunks, so memory follows
+    the vocabulary rather than the corpus text. With a token store the stored
+    token IDs are summed per group instead of tokenizing the text again.
+    """
+    levels = ['sentiment_label', 'bank', 'token']
+    is_corpus = isinstance(reviews, ReviewCorpus)
+    if store is not None:
+        # Only labels and digests are needed: no review text is decoded
+        labels = reviews.frame(['sentiment_label', 'bank']) if is_corpus else reviews
+        digests = reviews.column('digest') if is_corpus else review_digests(reviews)
+        groups, keys = pd.MultiIndex.from_arrays([labels['sentiment_label'].astype(str),
+                                                  labels['bank'].astype(str)]).factorize()
+        membership = sparse.csr_matrix((np.ones(len(labels)), (groups, np.arange(len(labels)))),
+                                       shape=(len(keys), len(labels)))
+        grouped = (membership @ token_counts(store, rows_for_digests(store, digests))).tocoo()
+        index = pd.MultiIndex.from_arrays([keys.get_level_values(0)[grouped.row],
+                                           keys.get_level_values(1)[grouped.row],
+                                           np.array(store.vocab, dtype=object)[grouped.col]],
+                                          names=levels)
+        return pd.Series(grouped.data.astype('int64'), index=index)
+    
+    counts = pd.Series(dtype='int64', index=pd.MultiIndex.from_arrays([[], [], []], names=levels))
+    for start in range(0, len(reviews), chunk_size):
+        chunk = (reviews.frame(['review', 'sentiment_label', 'bank'], start, start + chunk_size)
+                 if is_corpus else reviews.iloc[start:start + chunk_size])
+        tokens = chunk['review'].fillna('').astype(str).str.lower().str.findall(TOKEN_PATTERN)
+        tokens = pd.DataFrame({'sentiment_label': chunk['sentiment_label'].astype(str),
+                               'bank': chunk['bank'].astype(str),
+                               'token': tokens}).explode('token').dropna(subset=['token'])
+        partial = tokens.groupby(levels).size()
+        counts = counts.add(partial, fill_value=0).astype('int64')
+    return counts
+
+def word_frequencies(counts, sentiment, stopwords=WORDCLOUD_STOPWORDS, bank=None):
+    """Token counts of one sentiment (optionally one bank), without stopwords"""
+    selected = counts.index.get_level_values('sentiment_label') == sentiment
+    if bank is not None:
+        selected &= counts.index.get_level_values('bank') == bank
+    counts = counts[selected].groupby(level='token').sum()
+    return counts[~counts.index.isin(list(stopwords))]
+
+def get_top_words(counts, sentiment, n=20, bank=None):
+    """Most common words (longer than two letters) of one sentiment, as (word, count) pairs"""
+    frequencies = word_frequencies(counts, sentiment, STOPWORDS, bank)
+    frequencies = frequencies[frequencies.index.str.len() > 2]
+    return [(word, int(count)) for word, count in
+            frequencies.sort_values(ascending=False, kind='stable').head(n).items()]
+
+def create_wordclouds(reviews, fmt=DEFAULT_FORMAT, dpi=DEFAULT_DPI, token_store=TOKEN_STORE):
     """Plot 3: Word clouds for positive and negative reviews"""
-    # Separate positive and negative reviews
-    positive_reviews = ' '.join(df[df['sentiment_label'] == 'POSITIVE']['review'].astype(str).fillna(''))
-    negative_reviews = ' '.join(df[df['sentiment_label'] == 'NEGATIVE']['review'].astype(str).fillna(''))
+    # Reviews come as a DataFrame, a ReviewCorpus or the path of one
+    if isinstance(reviews, str):
+        reviews = ReviewCorpus(reviews)
+    
+    # Count words once for both clouds and the top-words lists, from the
+    # token store when it covers these reviews
+    store = load_token_store(token_store) if token_store else None
+    try:
+        counts = count_tokens(reviews, store=store)
+    except KeyError as e:
+        print(f"⚠️ {e}; tokenizing review text")
+        counts = count_tokens(reviews)
     
     # Create word clouds
     fig, axes = plt.subplots(1, 2, figsize=(16, 8))
@@ -117,7 +273,8 @@ def create_wordclouds(df):
     wordcloud_pos = WordCloud(width=800, height=400, 
                              background_color='white',
                              colormap='summer',
-                             max_words=100).generate(positive_reviews)
+                             max_words=100).generate_from_frequencies(
+                                 word_frequencies(counts, 'POSITIVE').to_dict())
     axes[0].imshow(wordcloud_pos, interpolation='bilinear')
     axes[0].set_title('Positive Reviews Word Cloud', fontsize=14, fontweight='bold')
     axes[0].axis('off')
@@ -126,46 +283,36 @@ def create_wordclouds(df):
     wordcloud_neg = WordCloud(width=800, height=400, 
                              background_color='white',
                              colormap='autumn',
-                             max_words=100).generate(negative_reviews)
+                             max_words=100).generate_from_frequencies(
+                                 word_frequencies(counts, 'NEGATIVE').to_dict())
     axes[1].imshow(wordcloud_neg, interpolation='bilinear')
     axes[1].set_title('Negative Reviews Word Cloud', fontsize=14, fontweight='bold')
     axes[1].axis('off')
     
     plt.tight_layout()
-    plt.savefig('outputs/wordclouds.png', dpi=300, bbox_inches='tight')
+    plt.savefig(chart_path('wordclouds', fmt), dpi=dpi, bbox_inches='tight')
     plt.close()
     
     print("✅ Created: Positive & Negative Word Clouds")
     
     # Extract top words for analysis
-    from collections import Counter
-    import re
-    
-    def get_top_words(text, n=20):
-        words = re.findall(r'\b\w+\b', text.lower())
-        # Filter out common stopwords
-        stopwords = set(['the', 'and', 'for', 'with', 'this', 'that', 'have', 'has', 
-                        'was', 'were', 'are', 'is', 'be', 'been', 'not', 'but', 'very',
-                        'app', 'bank', 'cbe', 'boa'])
-        words = [w for w in words if w not in stopwords and len(w) > 2]
-        return Counter(words).most_common(n)
-    
-    top_positive = get_top_words(positive_reviews)
-    top_negative = get_top_words(negative_reviews)
+    top_positive = get_top_words(counts, 'POSITIVE')
+    top_negative = get_top_words(counts, 'NEGATIVE')
     
     return top_positive, top_negative
 
-def plot_rating_distribution(df):
+def plot_rating_distribution(cube, fmt=DEFAULT_FORMAT, dpi=DEFAULT_DPI):
     """Plot 4: Detailed rating distribution"""
     fig, axes = plt.subplots(1, 3, figsize=(18, 6))
     
-    banks = df['bank'].unique()
+    summary = bank_summary(cube)
+    counts_by_bank = cube.groupby(['bank', 'rating'], observed=True)['review_count'].sum()
     
-    for idx, bank in enumerate(banks):
-        bank_data = df[df['bank'] == bank]
-        
+    for idx, bank in enumerate(summary.index):
         # Rating distribution
-        rating_counts = bank_data['rating'].value_counts().sort_index()
+        rating_counts = counts_by_bank.loc[bank]
+        rating_counts = rating_counts[rating_counts > 0]
+        rating_counts.index = rating_counts.index.astype(int)
         colors = ['#FF4444', '#FF9966', '#FFCC66', '#99CC66', '#66CC99']
         
         axes[idx].bar(rating_counts.index.astype(str), rating_counts.values, color=colors)
@@ -181,7 +328,7 @@ def plot_rating_distribution(df):
                           ha='center', fontsize=9)
         
         # Add average rating line
-        avg_rating = bank_data['rating'].mean()
+        avg_rating = summary.loc[bank, 'avg_rating']
         axes[idx].axhline(y=avg_rating * total/5, color='red', 
                          linestyle='--', alpha=0.7, linewidth=2)
         axes[idx].text(0.5, avg_rating * total/5 + total*0.05, 
@@ -189,59 +336,100 @@ def plot_rating_distribution(df):
                       ha='center', transform=axes[idx].transData)
     
     plt.tight_layout()
-    plt.savefig('outputs/rating_distribution_by_bank.png', dpi=300, bbox_inches='tight')
+    plt.savefig(chart_path('rating_distribution_by_bank', fmt), dpi=dpi, bbox_inches='tight')
     plt.close()
     
     print("✅ Created: Rating Distribution by Bank")
     
-    # Calculate insights
-    insights = {}
-    for bank in banks:
-        bank_data = df[df['bank'] == bank]
-        insights[bank] = {
-            'avg_rating': bank_data['rating'].mean(),
-            '5_star_pct': (bank_data['rating'] == 5).sum() / len(bank_data) * 100,
-            '1_star_pct': (bank_data['rating'] == 1).sum() / len(bank_data) * 100,
-            'total_reviews': len(bank_data)
-        }
-    
-    return insights
+    return rating_insights_from(summary)
+
+# Charts in rendering order (slowest first, as in pipeline_paths.CHART_NAMES),
+# with the function drawing each and the shared input it reads
+CHARTS = {
+    'wordclouds': (create_wordclouds, 'corpus'),
+    'sentiment_rating_by_bank': (plot_sentiment_by_bank, 'cube'),
+    'rating_distribution_by_bank': (plot_rating_distribution, 'cube'),
+    'sentiment_trends': (plot_sentiment_trends, 'trend_cube'),
+}
+
+# Read-only chart inputs: the path of a memory-mapped review corpus (workers
+# map the same pages, nothing is pickled or copied) and the small summary cubes
+_chart_data = {}
+
+def _init_chart_worker(data):
+    """Receive the chart inputs once per worker"""
+    _chart_data.update(data)
+
+def render_chart(name, fmt=DEFAULT_FORMAT, dpi=DEFAULT_DPI):
+    """Draw one chart from the shared inputs; returns its result and render time"""
+    start = time.perf_counter()
+    plot, source = CHARTS[name]
+    result = plot(_chart_data[source], fmt, dpi)
+    return result, time.perf_counter() - start
 
-def generate_insights_report(df, rating_insights, top_positive, top_negative):
+def render_charts(df, cube, trend_cube=None, fmt=DEFAULT_FORMAT, dpi=DEFAULT_DPI, workers=None):
+    """Render every chart, one process per chart (up to the CPU count); returns {chart: result}"""
+    if workers is None:
+        workers = min(len(CHARTS), os.cpu_count() or 1)
+    start = time.perf_counter()
+    
+    with tempfile.TemporaryDirectory(prefix='review_corpus_') as corpus_path:
+        write_corpus(df[['review', 'bank', 'sentiment_label']], corpus_path)
+        _chart_data.update(corpus=corpus_path, cube=cube,
+                           trend_cube=cube if trend_cube is None else trend_cube)
+        
+        if workers <= 1:
+            rendered = {name: render_chart(name, fmt, dpi) for name in CHARTS}
+        else:
+            # fork skips re-importing matplotlib in every worker where available
+            method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+            with ProcessPoolExecutor(max_workers=min(workers, len(CHARTS)),
+                                     mp_context=multiprocessing.get_context(method),
+                                     initializer=_init_chart_worker, initargs=(_chart_data,)) as pool:
+                futures = {name: pool.submit(render_chart, name, fmt, dpi) for name in CHARTS}
+                rendered = {name: future.result() for name, future in futures.items()}
+    
+    slowest = max(rendered, key=lambda name: rendered[name][1])
+    print(f"⏱️  Rendered {len(rendered)} charts in {time.perf_counter() - start:.1f}s "
+          f"(slowest: {slowest}, {rendered[slowest][1]:.1f}s)")
+    return {name: result for name, (result, _) in rendered.items()}
+
+def generate_insights_report(df, cube, rating_insights, top_positive, top_negative):
     """Generate insights and recommendations"""
     
     print("\n" + "="*60)
     print("DATA-DRIVEN INSIGHTS & RECOMMENDATIONS")
     print("="*60)
     
-    banks = df['bank'].unique()
+    summary = bank_summary(cube)
+    # First three positive and negative reviews of every bank, in one pass
+    samples = df[df['sentiment_label'].isin(['POSITIVE', 'NEGATIVE'])].groupby(
+        ['bank', 'sentiment_label'], observed=True).head(3)
+    samples = {key: group['review'] for key, group in
+               samples.groupby(['bank', 'sentiment_label'], observed=True)}
+    no_reviews = pd.Series(dtype=object)
     
-    for bank in banks:
-        bank_data = df[df['bank'] == bank]
-        negative_reviews = bank_data[bank_data['sentiment_label'] == 'NEGATIVE']
-        
+    for bank, totals in summary.iterrows():
         print(f"\n📊 {bank.upper()}")
         print("-" * 40)
         
         # Key metrics
-        print(f"• Total Reviews: {len(bank_data)}")
+        print(f"• Total Reviews: {int(totals['review_count'])}")
         print(f"• Average Rating: {rating_insights[bank]['avg_rating']:.2f} stars")
-        print(f"• Positive Sentiment: {(bank_data['sentiment_label'] == 'POSITIVE').sum() / len(bank_data) * 100:.1f}%")
-        print(f"• Negative Sentiment: {(bank_data['sentiment_label'] == 'NEGATIVE').sum() / len(bank_data) * 100:.1f}%")
+        print(f"• Positive Sentiment: {totals['positive'] / totals['review_count'] * 100:.1f}%")
+        print(f"• Negative Sentiment: {totals['negative'] / totals['review_count'] * 100:.1f}%")
         
         # Drivers (from positive reviews)
         print(f"\n✅ DRIVERS (Strengths):")
-        pos_sample = bank_data[bank_data['sentiment_label'] == 'POSITIVE'].head(3)
-        for _, row in pos_sample.iterrows():
-            if len(str(row['review'])) > 20:
-                print(f"  - \"{str(row['review'])[:100]}...\"")
+        for review in samples.get((bank, 'POSITIVE'), no_reviews):
+            if len(str(review)) > 20:
+                print(f"  - \"{str(review)[:100]}...\"")
         
         # Pain Points (from negative reviews)
         print(f"\n❌ PAIN POINTS (Issues):")
-        neg_sample = bank_data[bank_data['sentiment_label'] == 'NEGATIVE'].head(3)
-        for _, row in neg_sample.iterrows():
-            if len(str(row['review'])) > 20:
-                print(f"  - \"{str(row['review'])[:100]}...\"")
+        for review in samples.get((bank, 'NEGATIVE'), no_reviews):
+            if len(str(review)) > 20:
+                print(f"  - \"{str(review)[:100]}...\"")
         
         # Recommendations
         print(f"\n💡 RECOMMENDATIONS:")
@@ -283,40 +471,43 @@ def generate_insights_report(df, rating_insights, top_positive, top_negative):
     print("• Temporal Bias: Recent updates may not be reflected in historical reviews")
     print("• Cultural Bias: English reviews may not represent all user segments")
 
-def main():
+def main(df=None, fmt=DEFAULT_FORMAT, dpi=DEFAULT_DPI, workers=None, trends_db=None):
     print("="*60)
     print("TASK 4: FINAL VISUALIZATIONS & INSIGHTS")
     print("="*60)
     
     # Create outputs directory
-    import os
-    os.makedirs('outputs', exist_ok=True)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
     
     # Load data
-    df = load_data()
+    df = load_data(df)
     print(f"📊 Loaded {len(df)} reviews for analysis")
     
-    # Generate visualizations
+    # One aggregation pass: the summary cube drives every chart and the report
+    cube = build_summary_cube(df)
+    
+    # Generate visualizations (each chart in its own process)
     print("\n📈 CREATING VISUALIZATIONS...")
-    rating_by_bank = plot_sentiment_by_bank(df)
-    monthly_trends = plot_sentiment_trends(df)
-    top_pos, top_neg = create_wordclouds(df)
-    rating_insights = plot_rating_distribution(df)
+    results = render_charts(df, cube, load_trend_cube(cube, trends_db), fmt=fmt, dpi=dpi,
+                            workers=workers)
+    top_pos, top_neg = results['wordclouds']
+    rating_insights = results['rating_distribution_by_bank']
     
     # Generate insights
-    generate_insights_report(df, rating_insights, top_pos, top_neg)
+    generate_insights_report(df, cube, rating_insights, top_pos, top_neg)
     
     print("\n" + "="*60)
     print("✅ TASK 4 COMPLETED")
     print("="*60)
-    print(f"Visualizations saved to 'outputs/' folder:")
-    print("1. sentiment_rating_by_bank.png")
-    print("2. sentiment_trends.png")
-    print("3. wordclouds.png")
-    print("4. rating_distribution_by_bank.png")
-    print("\nTotal: 4 high-quality visualizations for final report")
+    print(f"Visualizations saved to '{OUTPUT_DIR}/' folder ({dpi} dpi):")
+    for n, name in enumerate(['sentiment_rating_by_bank', 'sentiment_trends',
+                              'wordclouds', 'rating_distribution_by_bank'], 1):
+        print(f"{n}. {os.path.basename(chart_path(name, fmt))}")
+    print(f"\nTotal: {len(CHARTS)} visualizations for final report")
 
 if __name__ == "__main__":
+    import argparse
+    
     # Install wordcloud if needed
     try:
         from wordcloud import WordCloud
@@ -325,4 +516,17 @@ if __name__ == "__main__":
         subprocess.check_call(['pip', 'install', 'wordcloud'])
         from wordcloud import WordCloud
     
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Render the final charts and insights report')
+    parser.add_argument('--format', choices=CHART_FORMATS, default=DEFAULT_FORMAT,
+                       help=f'Chart file format (default: {DEFAULT_FORMAT})')
+    parser.add_argument('--dpi', type=int, default=DEFAULT_DPI,
+                       help=f'Chart resolution; e.g. 72 for quick previews (default: {DEFAULT_DPI})')
+    parser.add_argument('--workers', type=int, default=None,
+                       help=f'Chart rendering processes; 1 renders in this process '
+                            '(default: one per chart, up to the CPU count)')
+    parser.add_argument('--trends-db', type=str, default=None,
+                       help='Read monthly trends from the daily rollup in this SQLite database '
+                            '(used only if it holds the charted reviews)')
+    args = parser.parse_args()
+    
+    main(fmt=args.format, dpi=args.dpi, workers=args.workers, trends_db=args.trends_db)
@@ -0,0 +1,20 @@
+# scripts/pipeline_paths.py
+# Output locations and chart settings shared by the analysis scripts and the
+# pipeline runner. Kept free of heavy imports so the runner can fingerprint
+# stages without loading their libraries.
+import os
+
+TOKEN_STORE = 'data/token_store'
+TOPIC_MODEL_FILE = 'models/topic_model.joblib'
+
+CHART_FORMATS = ['png', 'svg', 'pdf', 'jpg']
+DEFAULT_FORMAT = 'png'
+DEFAULT_DPI = 300
+OUTPUT_DIR = 'outputs'
+# Files final_visualizations renders, in rendering order (its CHARTS registry)
+CHART_NAMES = ['wordclouds', 'sentiment_rating_by_bank', 'rating_distribution_by_bank',
+               'sentiment_trends']
+
+def chart_path(name, fmt=DEFAULT_FORMAT):
+    """Output file of a chart in the given format"""
+    return os.path.join(OUTPUT_DIR, f"{name}.{fmt}")
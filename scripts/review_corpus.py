@@ -0,0 +1,91 @@
+# scripts/review_corpus.py
+import json
+import os
+import numpy as np
+import pandas as pd
+from dataset_io import review_digests
+
+TEXT_CHUNK = 100000   # reviews encoded at a time while writing the blob
+# Numeric columns stored as plain arrays (missing values as NaN/NaT)
+NUMERIC_COLUMNS = {'rating': 'float32', 'date': 'datetime64[s]', 'sentiment_score': 'float32'}
+# Repeated strings stored as integer codes plus their categories (-1 = missing)
+CODED_COLUMNS = ['bank', 'sentiment_label']
+
+def write_corpus(df, path):
+    """
+    Store reviews as one UTF-8 blob with int64 offsets, plus numeric and coded
+    columns as .npy arrays, so processes can memory-map and share one copy.
+    Missing review text is stored as an empty string.
+    """
+    os.makedirs(path, exist_ok=True)
+    texts = df['review'].fillna('').astype(str).to_numpy()
+    
+    # Blob written chunk by chunk so encoding never holds a second full copy
+    lengths = np.zeros(len(texts), dtype=np.int64)
+    with open(os.path.join(path, 'text.bin'), 'wb') as f:
+        for start in range(0, len(texts), TEXT_CHUNK):
+            encoded = [text.encode('utf-8') for text in texts[start:start + TEXT_CHUNK]]
+            lengths[start:start + len(encoded)] = [len(e) for e in encoded]
+            f.write(b''.join(encoded))
+    np.save(os.path.join(path, 'offsets.npy'), np.concatenate([[0], np.cumsum(lengths)]))
+    
+    columns, categories = [], {}
+    for column, dtype in NUMERIC_COLUMNS.items():
+        if column in df:
+            values = pd.to_datetime(df[column], errors='coerce') if column == 'date' \
+                else pd.to_numeric(df[column], errors='coerce')
+            np.save(os.path.join(path, column + '.npy'), values.to_numpy(dtype=dtype))
+            columns.append(column)
+    for column in CODED_COLUMNS:
+        if column in df:
+            values = df[column].astype('category')
+            np.save(os.path.join(path, column + '.npy'), values.cat.codes.to_numpy(dtype=np.int16))
+            categories[column] = [str(c) for c in values.cat.categories]
+            columns.append(column)
+    if 'bank' in df:
+        np.save(os.path.join(path, 'digest.npy'), review_digests(df))
+        columns.append('digest')
+    
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump({'rows': len(texts), 'columns': columns, 'categories': categories}, f, indent=2)
+    return ReviewCorpus(path)
+
+class ReviewCorpus:
+    """Memory-mapped review corpus written by write_corpus; slices decode on demand"""
+    
+    def __init__(self, path):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        self.path = path
+        self.categories = meta['categories']
+        self.offsets = np.load(os.path.join(path, 'offsets.npy'), mmap_mode='r')
+        # np.memmap cannot map an empty file
+        self.blob = (np.memmap(os.path.join(path, 'text.bin'), dtype=np.uint8, mode='r')
+                     if self.offsets[-1] else np.empty(0, dtype=np.uint8))
+        self.arrays = {column: np.load(os.path.join(path, column + '.npy'), mmap_mode='r')
+                       for column in meta['columns']}
+    
+    def __len__(self):
+        return len(self.offsets) - 1
+    
+    def texts(self, start=0, stop=None):
+        """Review texts of rows start..stop, decoded from one contiguous slice"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return []
+        chunk = self.blob[self.offsets[start]:self.offsets[stop]].tobytes()
+        bounds = self.offsets[start:stop + 1] - self.offsets[start]
+        return [chunk[a:b].decode('utf-8') for a, b in zip(bounds[:-1], bounds[1:])]
+    
+    def column(self, name, start=0, stop=None):
+        """A column slice: arrays stay memory-mapped, coded columns become categoricals"""
+        values = self.arrays[name][start:stop]
+        if name in self.categories:
+            return pd.Categorical.from_codes(values, self.categories[name])
+        return values
+    
+    def frame(self, columns=None, start=0, stop=None):
+        """DataFrame of the requested columns ('review' decodes text) for rows start..stop"""
+        columns = columns or ['review'] + list(self.arrays)
+        return pd.DataFrame({column: self.texts(start, stop) if column == 'review'
+                             else self.column(column, start, stop) for column in columns})
@@ -0,0 +1,284 @@
+# scripts/run_pipeline.py
+import hashlib
+import json
+import os
+import resource
+import time
+from database_setup import SQLITE_PATH
+from dataset_io import (RAW_REVIEWS, CLEANED_REVIEWS, SENTIMENT_REVIEWS, dataset_files,
+                        parquet_path, read_dataset, write_dataset)
+from pipeline_paths import (CHART_FORMATS, CHART_NAMES, DEFAULT_DPI, DEFAULT_FORMAT, TOKEN_STORE,
+                            TOPIC_MODEL_FILE, chart_path)
+
+STAGES = ['scrape', 'clean', 'sentiment', 'tokenize', 'thematic', 'load', 'visualize']
+# Stage whose output DataFrame each stage consumes
+STAGE_INPUTS = {
+    'clean': 'scrape',
+    'sentiment': 'clean',
+    'tokenize': 'sentiment',
+    'thematic': 'sentiment',
+    'load': 'sentiment',
+    'visualize': 'sentiment',
+}
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+FINGERPRINT_FILE = 'data/pipeline_fingerprints.json'
+
+def reset_peak_memory():
+    """Reset the kernel's peak-RSS counter so each stage reports its own peak (Linux)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def peak_memory_mb():
+    """Peak resident memory in MB since the last reset (or process start)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KB on Linux and bytes on macOS; never reset
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# Each stage takes its input stage's DataFrame (None when that stage did not
+# run, so the data is read from disk) and returns its own output, if any.
+# Modules are imported on first use so a subset of stages only pays for the
+# libraries it needs.
+
+def stage_scrape(df, args):
+    from scrape_reviews import run_scrape
+    # Scraped pages stream to disk one page at a time; read the export once.
+    # None means partitions failed; an incremental run with nothing new is fine
+    if run_scrape(incremental=args.incremental, output_path=RAW_REVIEWS) is None:
+        raise RuntimeError("scraping failed; rerun scrape_reviews.py with --resume")
+    return read_dataset(RAW_REVIEWS)
+
+def stage_clean(df, args):
+    from clean_data import clean_review_data
+    return clean_review_data(df, near_duplicates=args.near_duplicates)
+
+def stage_sentiment(df, args):
+    from sentiment_analysis import analyze_full_dataset, print_report
+    result_df = analyze_full_dataset(sample_size=args.sample, workers=args.workers,
+                                     backend=args.backend, df=df)
+    result_df = write_dataset(result_df, SENTIMENT_REVIEWS)
+    print_report(result_df.groupby(['bank', 'sentiment_label'], observed=True).size())
+    return result_df
+
+def stage_tokenize(df, args):
+    from token_store import update_token_store
+    if df is None:
+        df = read_dataset(SENTIMENT_REVIEWS, columns=['review', 'bank'])
+    update_token_store(df)
+
+def stage_thematic(df, args):
+    from thematic_analysis import run_thematic_analysis
+    if df is None:
+        df = read_dataset(SENTIMENT_REVIEWS)
+    run_thematic_analysis(df)
+
+def stage_load(df, args):
+    from database_setup import setup_database
+    if not setup_database(backend=args.db_backend, df=df):
+        raise RuntimeError("database load failed")
+
+def stage_visualize(df, args):
+    from final_visualizations import main as visualize
+    visualize(df, fmt=args.chart_format, dpi=args.dpi,
+              trends_db=SQLITE_PATH if args.trends_from_db else None)
+
+STAGE_FUNCTIONS = {
+    'scrape': stage_scrape,
+    'clean': stage_clean,
+    'sentiment': stage_sentiment,
+    'tokenize': stage_tokenize,
+    'thematic': stage_thematic,
+    'load': stage_load,
+    'visualize': stage_visualize,
+}
+
+def stage_spec(stage, args):
+    """Files read and written, parameters and code a stage's result depends on
+    
+    Returns None for stages that are never skipped (scraping reads the network).
+    """
+    datasets = lambda path: [path, parquet_path(path)]
+    code = lambda *modules: [os.path.join(SCRIPTS_DIR, m + '.py') for m in modules + ('dataset_io',)]
+    if stage == 'clean':
+        return {'inputs': [RAW_REVIEWS], 'outputs': dataset_files(CLEANED_REVIEWS, csv=True),
+                'params': {'near_duplicates': args.near_duplicates}, 'code': code('clean_data')}
+    if stage == 'sentiment':
+        # MODEL_NAME/MODEL_REVISION live in sentiment_analysis.py, so the code
+        # hash covers a model change without importing transformers here
+        return {'inputs': datasets(CLEANED_REVIEWS), 'outputs': dataset_files(SENTIMENT_REVIEWS),
+                'params': {'sample': args.sample, 'backend': args.backend},
+                'code': code('sentiment_analysis', 'review_corpus')}
+    if stage == 'tokenize':
+        return {'inputs': datasets(SENTIMENT_REVIEWS), 'outputs': [TOKEN_STORE],
+                'params': {}, 'code': code('token_store', 'pipeline_paths')}
+    if stage == 'thematic':
+        return {'inputs': datasets(SENTIMENT_REVIEWS) + [TOKEN_STORE],
+                'outputs': [TOPIC_MODEL_FILE],
+                'params': {}, 'code': code('thematic_analysis', 'token_store', 'pipeline_paths')}
+    if stage == 'load':
+        return {'inputs': datasets(SENTIMENT_REVIEWS),
+                'outputs': [SQLITE_PATH] if args.db_backend == 'sqlite' else [],
+                'params': {'db_backend': args.db_backend}, 'code': code('database_setup')}
+    if stage == 'visualize':
+        # Trends come from the SQLite rollup only when asked for
+        return {'inputs': datasets(SENTIMENT_REVIEWS) + [TOKEN_STORE]
+                + ([SQLITE_PATH] if args.trends_from_db else []),
+                'outputs': [chart_path(name, args.chart_format) for name in CHART_NAMES],
+                'params': {'trends_from_db': args.trends_from_db, 'chart_format': args.chart_format,
+                           'dpi': args.dpi},
+                'code': code('final_visualizations', 'token_store', 'review_corpus',
+                             'pipeline_paths')}
+    return None
+
+def iter_files(path):
+    """A file, or every file under a directory (e.g. a Parquet dataset), in stable order"""
+    if os.path.isfile(path):
+        yield path
+    elif os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                yield os.path.join(root, name)
+
+def file_digest(path, hash_cache):
+    """sha256 of a file, reusing the cached digest while size and mtime are unchanged"""
+    stat = os.stat(path)
+    key = [stat.st_size, stat.st_mtime_ns]
+    cached = hash_cache.get(path)
+    if cached and cached[:2] == key:
+        return cached[2]
+    
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    hash_cache[path] = key + [digest.hexdigest()]
+    return digest.hexdigest()
+
+def stage_fingerprint(spec, hash_cache):
+    """Hash of everything a stage's output is built from"""
+    digest = hashlib.sha256()
+    for path in spec['inputs'] + spec['code']:
+        digest.update(path.encode('utf-8'))
+        for file_path in iter_files(path):
+            digest.update(file_path.encode('utf-8'))
+            digest.update(file_digest(file_path, hash_cache).encode('ascii'))
+    digest.update(json.dumps(spec['params'], sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+def load_fingerprints(path=FINGERPRINT_FILE):
+    if not os.path.exists(path):
+        return {'stages': {}, 'files': {}}
+    with open(path) as f:
+        return json.load(f)
+
+def save_fingerprints(fingerprints, path=FINGERPRINT_FILE):
+    """Atomically record stage fingerprints"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(fingerprints, f, indent=2)
+    os.replace(tmp_path, path)
+
+def run_pipeline(stages, args, force=False):
+    """Run the stages in pipeline order in this process; returns per-stage timings
+    
+    A stage whose fingerprint matches the last successful run, and whose
+    outputs still exist, is skipped unless force is set.
+    """
+    timings = []
+    outputs = {}
+    selected = [s for s in STAGES if s in stages]
+    fingerprints = load_fingerprints()
+    
+    for n, stage in enumerate(selected):
+        # Release outputs no remaining stage consumes
+        needed = {STAGE_INPUTS.get(s) for s in selected[n:]}
+        outputs = {name: df for name, df in outputs.items() if name in needed}
+        
+        print(f"\n{'=' * 60}\n▶️  STAGE: {stage}\n{'=' * 60}")
+        reset_peak_memory()
+        start = time.perf_counter()
+        
+        # Inputs are hashed now, after upstream stages have written them
+        spec = stage_spec(stage, args)
+        fingerprint = spec and stage_fingerprint(spec, fingerprints['files'])
+        if (not force and fingerprint and fingerprints['stages'].get(stage) == fingerprint
+                and all(os.path.exists(path) for path in spec['outputs'])):
+            print(f"✅ Up to date (fingerprint {fingerprint[:12]}), skipping")
+            timings.append((stage, time.perf_counter() - start, peak_memory_mb(), 'cached'))
+            continue
+        
+        try:
+            outputs[stage] = STAGE_FUNCTIONS[stage](outputs.get(STAGE_INPUTS.get(stage)), args)
+        except Exception as e:
+            print(f"❌ Stage '{stage}' failed: {e}")
+            timings.append((stage, time.perf_counter() - start, peak_memory_mb(), 'failed'))
+            fingerprints['stages'].pop(stage, None)
+            save_fingerprints(fingerprints)
+            break
+        
+        timings.append((stage, time.perf_counter() - start, peak_memory_mb(), 'ok'))
+        if fingerprint:
+            fingerprints['stages'][stage] = fingerprint
+            save_fingerprints(fingerprints)
+    
+    return timings
+
+def print_timings(timings):
+    """Per-stage wall time and peak memory"""
+    print("\n=== PIPELINE SUMMARY ===")
+    print(f"{'stage':<12}{'status':<8}{'wall time':>12}{'peak RSS':>12}")
+    for stage, seconds, peak_mb, status in timings:
+        print(f"{stage:<12}{status:<8}{seconds:>11.1f}s{peak_mb:>9.0f} MB")
+    print(f"{'total':<20}{sum(t[1] for t in timings):>11.1f}s")
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Run the review analytics pipeline in one process')
+    parser.add_argument('--stages', type=str, default=','.join(STAGES),
+                       help=f'Comma-separated stages to run, in pipeline order '
+                            f'(default: {",".join(STAGES)})')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Scrape only reviews newer than the stored watermarks')
+    parser.add_argument('--near-duplicates', choices=['drop', 'flag', 'off'], default='drop',
+                       help='Near-duplicate handling in the clean stage (default: drop)')
+    parser.add_argument('--sample', type=int, default=2000,
+                       help='Reviews to score in the sentiment stage; 0 for all (default: 2000)')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Worker processes for sentiment scoring (default: 1)')
+    parser.add_argument('--backend', choices=['torch', 'int8', 'onnx'], default='torch',
+                       help='Sentiment inference backend (default: torch)')
+    parser.add_argument('--db-backend', choices=['postgres', 'sqlite'], default='postgres',
+                       help='Database for the load stage (default: postgres)')
+    parser.add_argument('--chart-format', choices=CHART_FORMATS, default=DEFAULT_FORMAT,
+                       help=f'File format of the visualize stage charts (default: {DEFAULT_FORMAT})')
+    parser.add_argument('--dpi', type=int, default=DEFAULT_DPI,
+                       help=f'Resolution of the visualize stage charts (default: {DEFAULT_DPI})')
+    parser.add_argument('--trends-from-db', action='store_true',
+                       help=f'Chart monthly trends from the daily rollup in {SQLITE_PATH} '
+                            f'(load with --db-backend sqlite); checked against the charted reviews')
+    parser.add_argument('--force', action='store_true',
+                       help=f'Rerun stages even when their fingerprint in {FINGERPRINT_FILE} '
+                            f'is unchanged')
+    args = parser.parse_args()
+    
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+    
+    print_timings(run_pipeline(stages, args, force=args.force))
+
+if __name__ == "__main__":
+    main()
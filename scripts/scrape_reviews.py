@@ -1,7 +1,13 @@
 # scrape_reviews.py
 import pandas as pd
-from google_play_scraper import app, Sort, reviews_all
+from google_play_scraper import app, Sort, reviews
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import json
+import os
+import threading
 import time
+from dataset_io import RAW_REVIEWS
 
 # App IDs for the three banks
 # You may need to verify these IDs are correct
@@ -11,75 +17,394 @@ app_ids = {
     'dashen': 'com.cr2.amolelight'
 }
 
+BANKS = [('cbe', 'Commercial Bank of Ethiopia'),
+         ('boa', 'Bank of Abyssinia'),
+         ('dashen', 'Dashen Bank')]
 
-def scrape_app_reviews(app_id, bank_name):
+PLAY_HOST = 'play.google.com'
+PAGE_SIZE = 200           # reviews per request (the Play endpoint maximum)
+MAX_WORKERS = 4           # concurrent (app, lang, country) scrapes
+REQUESTS_PER_SECOND = 5   # per host, shared by all workers
+# The one raw dataset kept as CSV only: it is streamed and appended page by page,
+# and read_dataset falls back to the CSV when there is no Parquet copy
+OUTPUT_FILE = RAW_REVIEWS
+STATE_FILE = 'data/scrape_state.json'
+RAW_DIR = 'data/raw_reviews'   # one JSONL partition + checkpoint per (app, lang, country)
+
+
+class RateLimiter:
+    """Thread-safe limiter that spaces requests to one host evenly"""
+    
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+    
+    def wait(self):
+        """Block until this caller's request slot comes up"""
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(host=PLAY_HOST, rate=None):
+    """One shared limiter per host; passing a rate updates it"""
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = _limiters[host] = RateLimiter(rate or REQUESTS_PER_SECOND)
+        elif rate:
+            limiter.interval = 1.0 / rate
+        return limiter
+
+def is_new_review(review, watermark=None, since=None):
+    """True while paging newest-first has not yet reached stored reviews or the since date"""
+    if since is not None and review['at'] < since:
+        return False
+    if watermark:
+        newest_at = datetime.fromisoformat(watermark['newest_at'])
+        # Reviews on the watermark timestamp may be new; older ones never are
+        if review['at'] < newest_at:
+            return False
+        if review['at'] == newest_at and review['reviewId'] in watermark['newest_ids']:
+            return False
+    return True
+
+def partition_path(app_id, lang, country, raw_dir=RAW_DIR):
+    return os.path.join(raw_dir, f"{app_id}_{lang}_{country}.jsonl")
+
+def load_checkpoint(path):
+    """Checkpoint of a partially scraped partition, or None"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_checkpoint(checkpoint, path):
+    """Atomically replace the checkpoint so a crash never leaves it half written"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+def token_fields(token):
+    """The attributes of a continuation token returned by reviews(), as JSON values"""
+    fields = {name: getattr(token, name) for name in getattr(type(token), '__slots__', ())}
+    if isinstance(fields.get('sort'), Sort):
+        fields['sort'] = fields['sort'].name
+    return fields
+
+def restore_token(fields):
+    """
+    Rebuild a saved continuation token, or None when it was saved by a
+    google_play_scraper version whose (private) token class has other fields
+    """
+    try:
+        from google_play_scraper.features.reviews import _ContinuationToken
+    except ImportError:
+        return None
+    if not isinstance(fields, dict) or set(getattr(_ContinuationToken, '__slots__', ())) != set(fields):
+        return None
+    
+    # Filled attribute by attribute so a changed constructor signature cannot misplace fields
+    token = _ContinuationToken.__new__(_ContinuationToken)
+    for name, value in fields.items():
+        setattr(token, name, Sort[value] if name == 'sort' else value)
+    return token
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def fetch_reviews_to_file(app_id, lang='en', country='us', limiter=None, incremental=False,
+                          watermark=None, since=None, resume=False, raw_dir=RAW_DIR):
+    """
+    Page through an app's reviews, appending every page to its JSONL partition
+    as it arrives and checkpointing the continuation token after each page.
+    Only one page is held in memory at a time.
+    """
+    limiter = limiter or get_rate_limiter()
+    sort = Sort.NEWEST if incremental else Sort.MOST_RELEVANT
+    path = partition_path(app_id, lang, country, raw_dir)
+    checkpoint_path = path + '.checkpoint.json'
+    os.makedirs(raw_dir, exist_ok=True)
+    
+    checkpoint = load_checkpoint(checkpoint_path) if resume else None
+    token = None
+    if checkpoint is not None and checkpoint['token'] is not None:
+        token = restore_token(checkpoint['token'])
+        if token is None:
+            print(f"⚠️ Saved continuation token for {app_id} ({lang}-{country}) does not match "
+                  f"this google_play_scraper version; restarting the partition")
+            checkpoint = None
+    if checkpoint is None or checkpoint['sort'] != sort.name:
+        checkpoint = {'sort': sort.name, 'token': None, 'offset': 0, 'pages': 0, 'rows': 0,
+                      'newest_at': None, 'newest_ids': [], 'done': False, 'exported': False}
+    if checkpoint['done']:
+        return checkpoint
+    
+    with open(path, 'a+b') as f:
+        # Drop anything written after the last checkpoint (a page that was
+        # appended but whose token never got saved)
+        f.truncate(checkpoint['offset'])
+        
+        while not checkpoint['done']:
+            limiter.wait()
+            page, token = reviews(
+                app_id,
+                lang=lang,
+                country=country,
+                sort=sort,
+                count=PAGE_SIZE,
+                continuation_token=token
+            )
+            new_page = [review for review in page if is_new_review(review, watermark, since)]
+            
+            for review in new_page:
+                f.write((json.dumps(review, default=_json_default) + '\n').encode('utf-8'))
+                at = review['at'].isoformat()
+                if checkpoint['newest_at'] is None or at > checkpoint['newest_at']:
+                    checkpoint['newest_at'], checkpoint['newest_ids'] = at, [review['reviewId']]
+                elif at == checkpoint['newest_at']:
+                    checkpoint['newest_ids'].append(review['reviewId'])
+            f.flush()
+            os.fsync(f.fileno())
+            
+            checkpoint['done'] = (len(new_page) < len(page) or not page or
+                                  token is None or token.token is None)
+            checkpoint['token'] = None if checkpoint['done'] else token_fields(token)
+            checkpoint['offset'] = f.tell()
+            checkpoint['pages'] += 1
+            checkpoint['rows'] += len(new_page)
+            save_checkpoint(checkpoint, checkpoint_path)
+    
+    return checkpoint
+
+def read_partition(path, chunksize=None):
+    """Read a JSONL partition back (optionally as an iterator of chunks)"""
+    chunks = pd.read_json(path, lines=True, convert_dates=False, dtype=False,
+                          chunksize=chunksize or PAGE_SIZE)
+    for chunk in chunks:
+        chunk['at'] = pd.to_datetime(chunk['at'])
+        yield chunk
+
+def load_scrape_state(path=STATE_FILE):
+    """Per-app watermarks: newest review time and the review IDs at that time"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_scrape_state(state, path=STATE_FILE):
+    """Atomically persist per-app watermarks"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+def state_key(app_id, lang, country):
+    return f"{app_id}:{lang}:{country}"
+
+def advance_watermarks(state, scraped):
+    """Move each scraped app's watermark to its newest review"""
+    for summary in scraped:
+        if summary['newest_at'] is None:
+            continue
+        key = state_key(summary['app_id'], summary['lang'], summary['country'])
+        newest_ids = summary['newest_ids']
+        
+        old = state.get(key)
+        if old and old['newest_at'] == summary['newest_at']:
+            newest_ids = sorted(set(old['newest_ids']) | set(newest_ids))
+        elif old and old['newest_at'] > summary['newest_at']:
+            continue
+        state[key] = {'newest_at': summary['newest_at'], 'newest_ids': newest_ids}
+    return state
+
+def scrape_app_reviews(app_id, bank_name, lang='en', country='us', limiter=None,
+                       watermark=None, incremental=False, since=None, resume=False,
+                       raw_dir=RAW_DIR):
     """
-    Scrapes reviews for a given app ID and bank name.
+    Scrapes reviews for a given app ID and bank name into its JSONL partition.
+    With incremental=True only reviews newer than the watermark are fetched;
+    with resume=True a partition left unfinished by an earlier run is continued.
+    Returns a summary of the partition (rows, newest review, done flag).
     """
-    print(f"Scraping reviews for {bank_name} (App ID: {app_id})...")
+    limiter = limiter or get_rate_limiter()
+    summary = {'app_id': app_id, 'bank': bank_name, 'lang': lang, 'country': country,
+               'path': partition_path(app_id, lang, country, raw_dir),
+               'rows': 0, 'newest_at': None, 'newest_ids': [], 'done': False, 'exported': False}
+    print(f"Scraping reviews for {bank_name} (App ID: {app_id}, {lang}-{country})...")
     
     try:
         # First, try to get app info to verify the app exists
-        app_info = app(app_id)
+        limiter.wait()
+        app_info = app(app_id, lang=lang, country=country)
         print(f"App found: {app_info['title']}")
         
-        # Use reviews_all to get a large set of reviews
-        result = reviews_all(
-            app_id,
-            sleep_milliseconds=200,  # Increased pause to be more polite
-            lang='en',
-            country='us',
-            sort=Sort.MOST_RELEVANT
-        )
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(result)
-        df['bank'] = bank_name
-        print(f"Successfully scraped {len(df)} reviews for {bank_name}")
-        return df
+        checkpoint = fetch_reviews_to_file(app_id, lang=lang, country=country, limiter=limiter,
+                                           incremental=incremental, watermark=watermark,
+                                           since=since, resume=resume, raw_dir=raw_dir)
+        summary.update({key: checkpoint[key] for key in ('rows', 'newest_at', 'newest_ids', 'done')})
+        summary['exported'] = checkpoint.get('exported', False)
+        print(f"Successfully scraped {summary['rows']} reviews for {bank_name} ({lang}-{country})")
         
     except Exception as e:
-        print(f"Error scraping {bank_name} (App ID: {app_id}): {str(e)}")
-        return pd.DataFrame()
+        print(f"Error scraping {bank_name} (App ID: {app_id}, {lang}-{country}): {str(e)}")
+        checkpoint = load_checkpoint(summary['path'] + '.checkpoint.json')
+        if checkpoint:
+            summary['rows'] = checkpoint['rows']
+            print(f"⚠️ Kept {checkpoint['rows']} reviews on disk; rerun with --resume to continue")
+    
+    return summary
+
+def scrape_all(apps, langs=('en',), countries=('us',), max_workers=MAX_WORKERS,
+               rate=REQUESTS_PER_SECOND, state=None, since=None, resume=False, raw_dir=RAW_DIR):
+    """Scrape every (app, lang, country) combination on a bounded thread pool
+    
+    Passing the scrape state (or a since date) switches to incremental,
+    newest-first scraping. Returns one partition summary per combination.
+    """
+    limiter = get_rate_limiter(PLAY_HOST, rate)
+    jobs = [(app_id, bank_name, lang, country)
+            for app_id, bank_name in apps
+            for lang in langs
+            for country in countries]
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(scrape_app_reviews, app_id, bank_name, lang, country, limiter,
+                                   (state or {}).get(state_key(app_id, lang, country)),
+                                   state is not None or since is not None, since, resume, raw_dir)
+                   for app_id, bank_name, lang, country in jobs]
+        # Collect in submission order so the output is deterministic
+        return [future.result() for future in futures]
+
+def mark_exported(summary):
+    """Record in a partition's checkpoint that its reviews are in the CSV"""
+    checkpoint_path = summary['path'] + '.checkpoint.json'
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint is not None:
+        checkpoint['exported'] = True
+        save_checkpoint(checkpoint, checkpoint_path)
+    summary['exported'] = True
+
+def export_reviews(summaries, output_path=OUTPUT_FILE, append=False):
+    """
+    Stream finished partitions into the reviews CSV one page at a time. When
+    appending, partitions an earlier (resumed) run already exported are skipped.
+    """
+    seen_ids = set()
+    counts = {}
+    header = not append
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    
+    for summary in summaries:
+        if not summary['done'] or summary['rows'] == 0:
+            continue
+        if append and summary.get('exported'):
+            continue
+        for chunk in read_partition(summary['path']):
+            # The same review can be served for several lang/country combinations
+            chunk = chunk[~chunk['reviewId'].isin(seen_ids)].drop_duplicates(subset=['reviewId'])
+            seen_ids.update(chunk['reviewId'])
+            
+            # Select and rename columns
+            out = pd.DataFrame({'review': chunk['content'],
+                                'rating': chunk['score'],
+                                'date': chunk['at'].dt.strftime('%Y-%m-%d'),
+                                'bank': summary['bank'],
+                                'source': 'Google Play'})
+            out.to_csv(output_path, mode='w' if header else 'a', header=header, index=False)
+            header = False
+            counts[summary['bank']] = counts.get(summary['bank'], 0) + len(out)
+    
+    for summary in summaries:
+        if summary['done']:
+            mark_exported(summary)
+    return pd.Series(counts, name='bank', dtype='int64')
+
+def run_scrape(langs=('en',), countries=('us',), max_workers=MAX_WORKERS,
+               rate=REQUESTS_PER_SECOND, incremental=False, since=None, resume=False,
+               output_path=OUTPUT_FILE, state_path=STATE_FILE, raw_dir=RAW_DIR):
+    """Scrape all banks and export finished partitions; returns review counts by bank"""
+    incremental = incremental or since is not None
+    # Watermarks are kept on every run, so a later incremental run starts
+    # where a full scrape left off
+    state = load_scrape_state(state_path)
+    apps = [(app_ids[bank_key], bank_name) for bank_key, bank_name in BANKS]
+    summaries = scrape_all(apps,
+                           langs=langs,
+                           countries=countries,
+                           max_workers=max_workers,
+                           rate=rate,
+                           state=state if incremental else None,
+                           since=since,
+                           resume=resume,
+                           raw_dir=raw_dir)
+    
+    unfinished = [s for s in summaries if not s['done']]
+    if unfinished:
+        print(f"⚠️ {len(unfinished)} partition(s) unfinished; rerun with --resume to complete them")
+    
+    if not any(s['done'] and s['rows'] for s in summaries):
+        if unfinished:
+            print("No reviews were scraped successfully.")
+            return None
+        # Every partition finished without new reviews: the steady state of
+        # incremental runs, not a failure
+        print("✅ No new reviews since the last run")
+        save_scrape_state(advance_watermarks(state, summaries), state_path)
+        return pd.Series({}, name='bank', dtype='int64')
+    
+    # Save to CSV
+    append = incremental and os.path.exists(output_path)
+    counts = export_reviews(summaries, output_path, append=append)
+    verb = 'appended' if append else 'saved'
+    print(f"Successfully {verb} {counts.sum()} reviews to {output_path}")
+    
+    # Only advance watermarks once the reviews are safely on disk
+    save_scrape_state(advance_watermarks(state, [s for s in summaries if s['done']]), state_path)
+    
+    # Print summary
+    print("\nSummary by bank:")
+    print(counts)
+    return counts
 
 def main():
-    all_reviews = []
+    import argparse
     
-    for bank_key, bank_name in [('cbe', 'Commercial Bank of Ethiopia'), 
-                                ('boa', 'Bank of Abyssinia'), 
-                                ('dashen', 'Dashen Bank')]:
-        app_id = app_ids[bank_key]
-        bank_reviews = scrape_app_reviews(app_id, bank_name)
-        
-        if not bank_reviews.empty:
-            all_reviews.append(bank_reviews)
-        
-        # Be polite to Google's servers
-        time.sleep(2)
+    parser = argparse.ArgumentParser(description='Scrape Google Play reviews for bank apps')
+    parser.add_argument('--langs', type=str, default='en',
+                       help='Comma-separated review languages (default: en)')
+    parser.add_argument('--countries', type=str, default='us',
+                       help='Comma-separated store countries (default: us)')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS,
+                       help=f'Concurrent scrapes (default: {MAX_WORKERS})')
+    parser.add_argument('--rate', type=float, default=REQUESTS_PER_SECOND,
+                       help=f'Max requests per second to {PLAY_HOST} (default: {REQUESTS_PER_SECOND})')
+    parser.add_argument('--incremental', action='store_true',
+                       help=f'Only fetch reviews newer than the per-app watermarks in {STATE_FILE} '
+                            f'and append them to {OUTPUT_FILE}')
+    parser.add_argument('--since', type=str, default=None,
+                       help='Skip reviews older than this date (YYYY-MM-DD); implies --incremental')
+    parser.add_argument('--resume', action='store_true',
+                       help=f'Continue partitions in {RAW_DIR} left unfinished by an interrupted run')
+    args = parser.parse_args()
     
-    if all_reviews:
-        # Combine all DataFrames
-        final_df = pd.concat(all_reviews, ignore_index=True)
-        
-        # Select and rename columns
-        final_df = final_df[['content', 'score', 'at', 'bank']]
-        final_df.columns = ['review', 'rating', 'date', 'bank']
-        
-        # Add source column
-        final_df['source'] = 'Google Play'
-        
-        # Convert date to YYYY-MM-DD format
-        final_df['date'] = final_df['date'].dt.strftime('%Y-%m-%d')
-        
-        # Save to CSV
-        final_df.to_csv('bank_reviews.csv', index=False)
-        print(f"Successfully saved {len(final_df)} reviews to bank_reviews.csv")
-        
-        # Print summary
-        print("\nSummary by bank:")
-        print(final_df['bank'].value_counts())
-    else:
-        print("No reviews were scraped successfully.")
+    run_scrape(langs=args.langs.split(','),
+               countries=args.countries.split(','),
+               max_workers=args.workers,
+               rate=args.rate,
+               incremental=args.incremental,
+               since=datetime.strptime(args.since, '%Y-%m-%d') if args.since else None,
+               resume=args.resume)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,90 +1,687 @@
 # scripts/sentiment_analysis.py
 import pandas as pd
 from transformers import pipeline
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+import tempfile
 import time
+from types import SimpleNamespace
 from tqdm import tqdm
+from dataset_io import CLEANED_REVIEWS, SENTIMENT_REVIEWS, read_dataset, remove_dataset, write_dataset
+from review_corpus import ReviewCorpus, write_corpus
+
+INPUT_FILE = CLEANED_REVIEWS
+MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+MODEL_REVISION = "main"
+CACHE_FILE = 'data/sentiment_cache.csv'
+CACHE_COLUMNS = ['key', 'sentiment_label', 'sentiment_score']
+CACHE_LOOKUP_BATCH = 500   # keys per SQL IN (...) lookup, below SQLite's variable limit
+FAILED_LABEL = 'FAILED'
+MAX_LENGTH = 512      # DistilBERT position limit, in tokens
+TOKEN_BUDGET = 8192   # padded tokens per forward pass
+CHUNK_SIZE = 10000    # reviews per chunk in streaming mode
+BACKENDS = ('torch', 'int8', 'onnx')
+ONNX_DIR = 'models'
+MIN_AGREEMENT = 0.99  # label agreement with fp32 expected from faster backends
+
+def review_text(text):
+    """Review text as every scoring path sees it: missing text is '', as in the corpus"""
+    return '' if pd.isna(text) else str(text)
+
+def normalize_text(text):
+    """Normalize review text for cache lookups (the model is uncased)"""
+    return re.sub(r'\s+', ' ', review_text(text)).strip().lower()
+
+def cache_key(text, model_name=MODEL_NAME, revision=MODEL_REVISION):
+    """Hash of the normalized review text plus model name/revision"""
+    payload = f"{model_name}@{revision}\x00{normalize_text(text)}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def load_sentiment_cache(path=CACHE_FILE):
+    """Load cached sentiment results as {key: (label, score)}"""
+    if not path or not os.path.exists(path):
+        return {}
+    cache_df = pd.read_csv(path)
+    return dict(zip(cache_df['key'],
+                    zip(cache_df['sentiment_label'], cache_df['sentiment_score'])))
+
+def save_sentiment_cache(new_entries, path=CACHE_FILE):
+    """Append newly scored results to the on-disk cache"""
+    if not path or not new_entries:
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    cache_df = pd.DataFrame(
+        [(key, label, score) for key, (label, score) in new_entries.items()],
+        columns=CACHE_COLUMNS
+    )
+    cache_df.to_csv(path, mode='a', index=False, header=not os.path.exists(path))
+
+def open_cache_index(path=CACHE_FILE):
+    """
+    SQLite index of the CSV cache (next to it, as <path>.index), so streaming
+    can look up one chunk's keys at a time instead of loading the whole cache
+    """
+    conn = sqlite3.connect(path + '.index')
+    conn.execute("CREATE TABLE IF NOT EXISTS cache "
+                 "(key TEXT PRIMARY KEY, sentiment_label TEXT, sentiment_score REAL)")
+    conn.execute("CREATE TABLE IF NOT EXISTS synced (csv_bytes INTEGER)")
+    sync_cache_index(conn, path)
+    return conn
+
+def sync_cache_index(conn, path=CACHE_FILE):
+    """Index the rows appended to the CSV cache since the last sync"""
+    row = conn.execute("SELECT csv_bytes FROM synced").fetchone()
+    offset = row[0] if row else 0
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    if size < offset:
+        # The CSV was replaced; keys hash the model revision, so old rows stay valid
+        offset = 0
+    if size > offset:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for chunk in pd.read_csv(f, header=0 if offset == 0 else None, names=CACHE_COLUMNS,
+                                     dtype={'key': str}, chunksize=CHUNK_SIZE):
+                conn.executemany("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                                 chunk.itertuples(index=False, name=None))
+    conn.execute("DELETE FROM synced")
+    conn.execute("INSERT INTO synced VALUES (?)", (size,))
+    conn.commit()
+
+def lookup_cache_index(conn, keys):
+    """Cached results of the given keys only, as {key: (label, score)}"""
+    keys = list(set(keys))
+    found = {}
+    for start in range(0, len(keys), CACHE_LOOKUP_BATCH):
+        batch = keys[start:start + CACHE_LOOKUP_BATCH]
+        rows = conn.execute("SELECT key, sentiment_label, sentiment_score FROM cache "
+                            f"WHERE key IN ({', '.join('?' * len(batch))})", batch)
+        found.update((key, (label, score)) for key, label, score in rows)
+    return found
+
+def backend_revision(backend='torch'):
+    """Model revision used in cache keys; faster backends can differ slightly from fp32"""
+    return MODEL_REVISION if backend == 'torch' else f"{MODEL_REVISION}+{backend}"
+
+class OnnxSequenceClassifier:
+    """ONNX Runtime session exposing the bits of the torch model we call"""
+    
+    def __init__(self, path, config, num_threads=None):
+        import onnxruntime as ort
+        
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(path, options,
+                                            providers=['CPUExecutionProvider'])
+        self.config = config
+    
+    def __call__(self, input_ids, attention_mask):
+        import torch
+        
+        logits = self.session.run(['logits'], {
+            'input_ids': input_ids.numpy(),
+            'attention_mask': attention_mask.numpy()
+        })[0]
+        return SimpleNamespace(logits=torch.from_numpy(logits))
+
+def export_onnx_model(onnx_dir=ONNX_DIR):
+    """Export the fp32 model to ONNX once and return the file path"""
+    path = os.path.join(onnx_dir, f"{MODEL_NAME}-{MODEL_REVISION}.onnx")
+    if os.path.exists(path):
+        return path
+    
+    import torch
+    from transformers import AutoModelForSequenceClassification
+    
+    print(f"Exporting {MODEL_NAME} to {path}...")
+    os.makedirs(onnx_dir, exist_ok=True)
+    model = AutoModelForSequenceClassification.from_pretrained(
+        MODEL_NAME, revision=MODEL_REVISION, torchscript=True).eval()
+    dummy = torch.ones((1, 8), dtype=torch.long)
+    tmp_path = path + '.tmp'
+    torch.onnx.export(
+        model, (dummy, dummy), tmp_path,
+        input_names=['input_ids', 'attention_mask'],
+        output_names=['logits'],
+        dynamic_axes={'input_ids': {0: 'batch', 1: 'sequence'},
+                      'attention_mask': {0: 'batch', 1: 'sequence'},
+                      'logits': {0: 'batch'}},
+        opset_version=14
+    )
+    os.replace(tmp_path, path)
+    return path
+
+def load_classifier(backend='torch', num_threads=None):
+    """Load the sentiment model once for the given inference backend"""
+    if backend == 'onnx':
+        from transformers import AutoConfig, AutoTokenizer
+        
+        tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME, revision=MODEL_REVISION)
+        config = AutoConfig.from_pretrained(MODEL_NAME, revision=MODEL_REVISION)
+        model = OnnxSequenceClassifier(export_onnx_model(), config, num_threads)
+        return SimpleNamespace(tokenizer=tokenizer, model=model)
+    
+    classifier = pipeline("sentiment-analysis",
+                          model=MODEL_NAME, revision=MODEL_REVISION)
+    if backend == 'int8':
+        import torch
+        
+        # Dynamic int8 quantization of the Linear layers (the bulk of the FLOPs)
+        classifier.model = torch.quantization.quantize_dynamic(
+            classifier.model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif backend != 'torch':
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+    return classifier
 
 def analyze_sentiment_batch(texts, classifier):
     """Analyze sentiment for a batch of texts"""
     results = classifier(texts)
     return results
 
-def analyze_full_dataset(sample_size=None):
-    """Analyze sentiment for full or sampled dataset"""
-    # Load cleaned data
-    df = pd.read_csv('data/cleaned_bank_reviews.csv')
+def tokenize_reviews(texts, tokenizer, max_length=MAX_LENGTH):
+    """Tokenize all reviews once, truncating by tokens rather than characters"""
+    encoded = tokenizer([review_text(text) for text in texts],
+                        truncation=True, max_length=max_length)
+    return encoded['input_ids']
+
+def build_token_batches(lengths, token_budget=TOKEN_BUDGET):
+    """Group row positions by token length so each padded batch fits the budget"""
+    # Rows without a length (tokenization failed) are left out
+    order = sorted((i for i, length in enumerate(lengths) if length is not None),
+                   key=lengths.__getitem__)
+    batches = []
+    batch = []
+    for idx in order:
+        # Sorted ascending, so the new row sets the padded width
+        if batch and lengths[idx] * (len(batch) + 1) > token_budget:
+            batches.append(batch)
+            batch = []
+        batch.append(idx)
+    if batch:
+        batches.append(batch)
+    return batches
+
+def new_stage_timings():
+    """Seconds spent per scoring stage"""
+    return {'tokenize': 0.0, 'forward': 0.0, 'postprocess': 0.0}
+
+def score_token_batch(input_ids, classifier, timings=None):
+    """Run the model on one batch of pre-tokenized reviews"""
+    import torch
     
-    if sample_size:
-        df = df.sample(n=min(sample_size, len(df)), random_state=42)
+    t0 = time.perf_counter()
+    features = classifier.tokenizer.pad({'input_ids': input_ids}, return_tensors='pt')
+    t1 = time.perf_counter()
+    with torch.no_grad():
+        logits = classifier.model(**features).logits
+    t2 = time.perf_counter()
+    scores, label_ids = torch.softmax(logits, dim=-1).max(dim=-1)
+    id2label = classifier.model.config.id2label
+    results = [(id2label[label_id], score)
+               for label_id, score in zip(label_ids.tolist(), scores.tolist())]
     
-    print(f"Analyzing sentiment for {len(df)} reviews...")
+    if timings is not None:
+        timings['tokenize'] += t1 - t0
+        timings['forward'] += t2 - t1
+        timings['postprocess'] += time.perf_counter() - t2
+    return results
+
+def failed_result(error):
+    """Result tuple for a review the model could not score"""
+    return (FAILED_LABEL, float('nan'), f"{type(error).__name__}: {error}")
+
+def score_batch_bisect(batch, input_ids, classifier, results, timings=None):
+    """Score a batch; on failure split it until the bad reviews are isolated"""
+    try:
+        batch_results = score_token_batch([input_ids[i] for i in batch], classifier, timings)
+    except Exception as e:
+        if len(batch) == 1:
+            results[batch[0]] = failed_result(e)
+            return
+        mid = len(batch) // 2
+        score_batch_bisect(batch[:mid], input_ids, classifier, results, timings)
+        score_batch_bisect(batch[mid:], input_ids, classifier, results, timings)
+        return
     
-    # Initialize model once
-    classifier = pipeline("sentiment-analysis", 
-                         model="distilbert-base-uncased-finetuned-sst-2-english")
+    for idx, (label, score) in zip(batch, batch_results):
+        results[idx] = (label, score, None)
+
+def score_fixed_batches(texts, classifier, batch_size=32):
+    """Original scoring loop: fixed-size batches in file order, character truncation"""
+    results = []
+    for i in range(0, len(texts), batch_size):
+        batch = [review_text(text)[:512] for text in texts[i:i+batch_size]]
+        results.extend((result['label'], result['score'])
+                       for result in analyze_sentiment_batch(batch, classifier))
+    return results
+
+def score_reviews(texts, classifier, token_budget=TOKEN_BUDGET, progress=True, timings=None):
+    """Score reviews with length-bucketed batches, returned in input order"""
+    # Each result is (label, score, error); error is None unless the review failed
+    if timings is None:
+        timings = new_stage_timings()
+    results = [None] * len(texts)
     
-    # Process in batches
-    batch_size = 32
-    sentiments = []
-    scores = []
+    start = time.perf_counter()
+    try:
+        input_ids = tokenize_reviews(texts, classifier.tokenizer)
+    except Exception:
+        # Fall back to one review at a time so only the bad ones fail
+        input_ids = []
+        for idx, text in enumerate(texts):
+            try:
+                input_ids.append(tokenize_reviews([text], classifier.tokenizer)[0])
+            except Exception as e:
+                input_ids.append(None)
+                results[idx] = failed_result(e)
+    timings['tokenize'] += time.perf_counter() - start
+    
+    batches = build_token_batches([None if ids is None else len(ids) for ids in input_ids],
+                                  token_budget)
+    for batch in tqdm(batches, desc="Processing", disable=not progress):
+        score_batch_bisect(batch, input_ids, classifier, results, timings)
+    
+    return results
+
+# Per-process model and open corpora used by the worker pool
+_worker_classifier = None
+_worker_corpora = {}
+
+def worker_env(num_threads):
+    """Thread settings for a scoring worker, read by torch/tokenizers when they start"""
+    return {'OMP_NUM_THREADS': str(num_threads), 'MKL_NUM_THREADS': str(num_threads),
+            'TOKENIZERS_PARALLELISM': 'false'}
+
+def _init_worker(num_threads, backend):
+    """Load the model once per worker process with a capped torch thread count"""
+    global _worker_classifier
+    # Also set here for workers the pool restarts after the parent restored its env
+    os.environ.update(worker_env(num_threads))
+    import torch
+    
+    torch.set_num_threads(num_threads)
+    torch.set_num_interop_threads(1)
+    _worker_classifier = load_classifier(backend, num_threads)
+
+def _score_shard(args):
+    """Score one (corpus path, start, stop, token_budget) shard inside a worker process"""
+    corpus_path, start, stop, token_budget = args
+    # Workers memory-map the shared corpus and decode only their own rows
+    if corpus_path not in _worker_corpora:
+        _worker_corpora.clear()
+        _worker_corpora[corpus_path] = ReviewCorpus(corpus_path)
+    texts = _worker_corpora[corpus_path].texts(start, stop)
+    timings = new_stage_timings()
+    results = score_reviews(texts, _worker_classifier, token_budget,
+                            progress=False, timings=timings)
+    return results, timings
+
+def start_worker_pool(workers, backend='torch'):
+    """Start a pool whose workers each hold one model with capped threads"""
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    
+    if backend == 'onnx':
+        # Export once here rather than racing in every worker
+        export_onnx_model()
+    
+    print(f"Starting {workers} scoring workers x {threads} threads ({backend})")
+    ctx = multiprocessing.get_context('spawn')
+    # Children inherit these before torch/tokenizers start their own pools;
+    # the parent's own settings are put back once the workers are started
+    env = worker_env(threads)
+    saved = {var: os.environ.get(var) for var in env}
+    os.environ.update(env)
+    try:
+        return ctx.Pool(workers, initializer=_init_worker, initargs=(threads, backend))
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+def score_reviews_parallel(texts, pool, workers, token_budget=TOKEN_BUDGET, timings=None):
+    """Shard reviews across a process pool and merge results back in order"""
+    # Several shards per worker keeps the pool busy when shards finish unevenly
+    shard_size = max(1, -(-len(texts) // (workers * 4)))
+    
+    # Texts go to the workers through one memory-mapped corpus file instead of
+    # being pickled shard by shard; each shard is just a row range
+    with tempfile.TemporaryDirectory(prefix='review_corpus_') as corpus_path:
+        write_corpus(pd.DataFrame({'review': texts}), corpus_path)
+        shards = [(corpus_path, i, i + shard_size, token_budget)
+                  for i in range(0, len(texts), shard_size)]
+        shard_results = list(tqdm(pool.imap(_score_shard, shards),
+                                  total=len(shards), desc="Processing"))
+    
+    # Stage timings are summed across workers
+    if timings is not None:
+        for _, shard_timings in shard_results:
+            for stage, seconds in shard_timings.items():
+                timings[stage] += seconds
+    return [result for shard, _ in shard_results for result in shard]
+
+def make_scorer(workers=1, token_budget=TOKEN_BUDGET, backend='torch'):
+    """Return (score, close); the model or worker pool starts on first use"""
+    state = {}
     
-    for i in tqdm(range(0, len(df), batch_size), desc="Processing"):
-        batch = df['review'].iloc[i:i+batch_size].tolist()
-        batch = [str(text)[:512] for text in batch]  # Truncate to model limit
+    def score(texts, timings):
+        if workers > 1:
+            if 'pool' not in state:
+                state['pool'] = start_worker_pool(workers, backend)
+            return score_reviews_parallel(texts, state['pool'], workers,
+                                          token_budget=token_budget, timings=timings)
+        if 'classifier' not in state:
+            # Initialize model once
+            state['classifier'] = load_classifier(backend)
+        return score_reviews(texts, state['classifier'], token_budget=token_budget,
+                             timings=timings)
+    
+    def close():
+        if 'pool' in state:
+            state['pool'].close()
+            state['pool'].join()
+    
+    return score, close
+
+def compare_batching_throughput(texts, classifier, batch_size=32, token_budget=TOKEN_BUDGET):
+    """Compare reviews/sec of the fixed-size loop and token-budget batching"""
+    texts = [review_text(text) for text in texts]
+    lengths = [len(ids) for ids in tokenize_reviews(texts, classifier.tokenizer)]
+    real_tokens = sum(lengths)
+    
+    fixed_padded = sum(max(lengths[i:i+batch_size]) * len(lengths[i:i+batch_size])
+                       for i in range(0, len(lengths), batch_size))
+    bucketed_padded = sum(max(lengths[i] for i in batch) * len(batch)
+                          for batch in build_token_batches(lengths, token_budget))
+    
+    start = time.perf_counter()
+    score_fixed_batches(texts, classifier, batch_size)
+    fixed_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    input_ids = tokenize_reviews(texts, classifier.tokenizer)
+    for batch in build_token_batches([len(ids) for ids in input_ids], token_budget):
+        score_token_batch([input_ids[i] for i in batch], classifier)
+    bucketed_time = time.perf_counter() - start
+    
+    print("\n=== BATCHING THROUGHPUT ===")
+    print(f"Reviews: {len(texts)}, real tokens: {real_tokens}")
+    print(f"Fixed {batch_size}-row batches: {len(texts) / fixed_time:.1f} reviews/sec, "
+          f"padding efficiency {real_tokens / fixed_padded * 100:.1f}%")
+    print(f"Token budget {token_budget}: {len(texts) / bucketed_time:.1f} reviews/sec, "
+          f"padding efficiency {real_tokens / bucketed_padded * 100:.1f}%")
+    print(f"Speedup: {fixed_time / bucketed_time:.2f}x")
+
+def check_backend_agreement(texts, backend, token_budget=TOKEN_BUDGET):
+    """Compare a backend's labels, scores and speed against the fp32 reference"""
+    texts = [review_text(text) for text in texts]
+    
+    start = time.perf_counter()
+    reference = score_reviews(texts, load_classifier('torch'), token_budget, progress=False)
+    reference_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    candidate = score_reviews(texts, load_classifier(backend), token_budget, progress=False)
+    candidate_time = time.perf_counter() - start
+    
+    pairs = [(ref, cand) for ref, cand in zip(reference, candidate)
+             if ref[2] is None and cand[2] is None]
+    agreement = sum(ref[0] == cand[0] for ref, cand in pairs) / max(len(pairs), 1)
+    score_diffs = [abs(ref[1] - cand[1]) for ref, cand in pairs]
+    
+    print(f"\n=== BACKEND AGREEMENT: {backend} vs fp32 ===")
+    print(f"Reviews compared: {len(pairs)}")
+    print(f"Label agreement: {agreement * 100:.2f}%")
+    if score_diffs:
+        print(f"Score difference: mean {sum(score_diffs) / len(score_diffs):.4f}, "
+              f"max {max(score_diffs):.4f}")
+    print(f"Speed: {len(texts) / reference_time:.1f} vs {len(texts) / candidate_time:.1f} "
+          f"reviews/sec ({reference_time / candidate_time:.2f}x)")
+    if agreement < MIN_AGREEMENT:
+        print(f"⚠️ Agreement below {MIN_AGREEMENT * 100:.0f}%, keep using the fp32 backend")
+    return agreement
+
+def score_dataframe(df, cache, scorer, cache_path=CACHE_FILE, backend='torch'):
+    """Add sentiment columns to df, sending only cache misses to the model"""
+    revision = backend_revision(backend)
+    texts = [review_text(text) for text in df['review']]
+    keys = [cache_key(text, revision=revision) for text in texts]
+    
+    # Only unique cache misses go to the model
+    miss_texts = {}
+    for key, text in zip(keys, texts):
+        if key not in cache and key not in miss_texts:
+            miss_texts[key] = text
+    
+    hits = sum(1 for key in keys if key in cache)
+    print(f"Sentiment cache: {hits} hits, {len(df) - hits} misses "
+          f"({len(miss_texts)} unique reviews to score)")
+    
+    new_entries = {}
+    failures = {}
+    if miss_texts:
+        miss_keys = list(miss_texts)
+        timings = new_stage_timings()
+        results = scorer([miss_texts[key] for key in miss_keys], timings)
         
-        try:
-            results = analyze_sentiment_batch(batch, classifier)
-            for result in results:
-                sentiments.append(result['label'])
-                scores.append(result['score'])
-        except Exception as e:
-            print(f"Error in batch {i}: {e}")
-            sentiments.extend(['NEUTRAL'] * len(batch))
-            scores.extend([0.5] * len(batch))
+        for key, (label, score, error) in zip(miss_keys, results):
+            if error is None:
+                new_entries[key] = (label, score)
+            else:
+                # Failures are not cached so the review is retried next run
+                failures[key] = (label, score, error)
         
-        # Brief pause every 10 batches
-        if i > 0 and i % (batch_size * 10) == 0:
-            time.sleep(1)
+        save_sentiment_cache(new_entries, cache_path)
+        cache.update(new_entries)
+        
+        print(f"Stage timings: tokenize {timings['tokenize']:.1f}s, "
+              f"forward {timings['forward']:.1f}s, "
+              f"postprocess {timings['postprocess']:.1f}s")
+        if failures:
+            print(f"⚠️ {len(failures)} reviews failed to score (see sentiment_error)")
     
     # Add results to dataframe
-    df['sentiment_label'] = sentiments
-    df['sentiment_score'] = scores
+    results = [cache[key] + (None,) if key in cache else failures[key] for key in keys]
+    df['sentiment_label'] = [result[0] for result in results]
+    df['sentiment_score'] = [result[1] for result in results]
+    df['sentiment_error'] = [result[2] for result in results]
     
     return df
 
+def analyze_full_dataset(sample_size=None, cache_path=CACHE_FILE, token_budget=TOKEN_BUDGET,
+                         workers=1, backend='torch', df=None):
+    """Analyze sentiment for full or sampled dataset"""
+    # Load cleaned data, unless handed over by the previous stage
+    if df is None:
+        df = read_dataset(INPUT_FILE)
+    
+    if sample_size:
+        df = df.sample(n=min(sample_size, len(df)), random_state=42)
+    
+    print(f"Analyzing sentiment for {len(df)} reviews...")
+    
+    # Look up previously scored reviews
+    cache = load_sentiment_cache(cache_path)
+    scorer, close_scorer = make_scorer(workers, token_budget, backend)
+    try:
+        return score_dataframe(df, cache, scorer, cache_path, backend)
+    finally:
+        close_scorer()
+
+def load_checkpoint(path):
+    """Load streaming progress, or None when starting fresh"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_checkpoint(state, path):
+    """Atomically record streaming progress"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+def analyze_streaming(output_path, chunk_size=CHUNK_SIZE, cache_path=CACHE_FILE,
+                      token_budget=TOKEN_BUDGET, workers=1, backend='torch',
+                      input_path=INPUT_FILE):
+    """Score the cleaned CSV chunk by chunk, appending each chunk to the output
+    
+    Progress is checkpointed after every chunk, so an interrupted run resumes
+    from the last completed chunk. Returns review counts by (bank, label).
+    """
+    checkpoint_path = output_path + '.checkpoint.json'
+    state = load_checkpoint(checkpoint_path)
+    
+    if state and os.path.exists(output_path):
+        # Drop anything appended after the last checkpoint (a half-written chunk)
+        with open(output_path, 'r+b') as f:
+            f.truncate(state['output_bytes'])
+        chunk_size = state['chunk_size']
+        print(f"Resuming after chunk {state['chunks_done']} "
+              f"({state['rows_done']} reviews already scored)")
+    else:
+        state = {'chunk_size': chunk_size, 'chunks_done': 0, 'rows_done': 0,
+                 'output_bytes': 0, 'counts': []}
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        remove_dataset(output_path)
+    
+    counts = {(bank, label): count for bank, label, count in state['counts']}
+    # Only each chunk's cached results are held in memory
+    index = open_cache_index(cache_path) if cache_path else None
+    revision = backend_revision(backend)
+    scorer, close_scorer = make_scorer(workers, token_budget, backend)
+    
+    try:
+        for n, chunk in enumerate(pd.read_csv(input_path, chunksize=chunk_size)):
+            if n < state['chunks_done']:
+                continue
+            
+            print(f"\nChunk {n + 1}: {len(chunk)} reviews")
+            cache = {}
+            if index is not None:
+                cache = lookup_cache_index(index, [cache_key(text, revision=revision)
+                                                   for text in chunk['review']])
+            chunk = score_dataframe(chunk, cache, scorer, cache_path, backend)
+            if index is not None:
+                sync_cache_index(index, cache_path)
+            chunk.to_csv(output_path, mode='a', index=False, header=(n == 0))
+            # Numbered Parquet parts, so redoing a chunk after a crash overwrites it
+            write_dataset(chunk, output_path, part=n, csv=False)
+            
+            for (bank, label), count in chunk.groupby(['bank', 'sentiment_label']).size().items():
+                counts[(bank, label)] = counts.get((bank, label), 0) + int(count)
+            
+            state['chunks_done'] = n + 1
+            state['rows_done'] += len(chunk)
+            state['output_bytes'] = os.path.getsize(output_path)
+            state['counts'] = [[bank, label, count] for (bank, label), count in counts.items()]
+            save_checkpoint(state, checkpoint_path)
+    finally:
+        close_scorer()
+        if index is not None:
+            index.close()
+    
+    # Finished cleanly, nothing to resume
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return pd.Series(counts, dtype='int64').rename_axis(['bank', 'sentiment_label'])
+
+def print_report(counts):
+    """Print the summary report from review counts by (bank, label)"""
+    total = counts.sum()
+    print("\n=== SENTIMENT ANALYSIS REPORT ===")
+    print(f"Total reviews analyzed: {total}")
+    
+    sentiment_counts = counts.groupby(level='sentiment_label').sum().sort_values(ascending=False)
+    for label, count in sentiment_counts.items():
+        percentage = count / total * 100
+        print(f"{label}: {count} ({percentage:.1f}%)")
+    
+    print("\n=== BY BANK ===")
+    for bank, bank_counts in counts.groupby(level='bank'):
+        bank_total = bank_counts.sum()
+        neg_count = bank_counts.droplevel('bank').get('NEGATIVE', 0)
+        neg_pct = neg_count / bank_total * 100
+        print(f"{bank}: {bank_total} reviews, {neg_count} negative ({neg_pct:.1f}%)")
+
 def main():
     import argparse
     
     parser = argparse.ArgumentParser(description='Sentiment analysis for bank reviews')
-    parser.add_argument('--sample', type=int, default=2000, 
+    parser.add_argument('--sample', type=int, default=2000,
                        help='Number of reviews to sample (default: 2000)')
-    parser.add_argument('--output', type=str, default='data/full_sentiment_analysis.csv',
-                       help='Output file path')
+    parser.add_argument('--output', type=str, default=SENTIMENT_REVIEWS,
+                       help='Output CSV path (a Parquet copy is written alongside)')
+    parser.add_argument('--cache', type=str, default=CACHE_FILE,
+                       help=f'Sentiment cache file (default: {CACHE_FILE})')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Score every review without reading or writing the cache')
+    parser.add_argument('--token-budget', type=int, default=TOKEN_BUDGET,
+                       help=f'Padded tokens per forward pass (default: {TOKEN_BUDGET})')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Worker processes for CPU scoring (default: 1)')
+    parser.add_argument('--backend', choices=BACKENDS, default='torch',
+                       help='Inference backend: fp32 torch, dynamic int8 torch or ONNX Runtime')
+    parser.add_argument('--check-agreement', action='store_true',
+                       help='Compare --backend labels and speed against fp32 on the sample and exit')
+    parser.add_argument('--stream', action='store_true',
+                       help='Score the full dataset chunk by chunk with resumable checkpoints')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                       help=f'Reviews per chunk in --stream mode (default: {CHUNK_SIZE})')
+    parser.add_argument('--compare-batching', action='store_true',
+                       help='Benchmark fixed-size vs token-budget batching on the sample and exit')
     
     args = parser.parse_args()
+    cache_path = None if args.no_cache else args.cache
+    
+    if args.compare_batching:
+        df = read_dataset(INPUT_FILE, columns=['review'])
+        if args.sample:
+            df = df.sample(n=min(args.sample, len(df)), random_state=42)
+        compare_batching_throughput(df['review'].tolist(), load_classifier(),
+                                    token_budget=args.token_budget)
+        return
+    
+    if args.check_agreement:
+        df = read_dataset(INPUT_FILE, columns=['review'])
+        if args.sample:
+            df = df.sample(n=min(args.sample, len(df)), random_state=42)
+        check_backend_agreement(df['review'].tolist(), args.backend,
+                                token_budget=args.token_budget)
+        return
+    
+    if args.stream:
+        # Streaming always covers the full dataset; sampling needs it all in memory
+        counts = analyze_streaming(args.output, chunk_size=args.chunk_size,
+                                   cache_path=cache_path,
+                                   token_budget=args.token_budget,
+                                   workers=args.workers,
+                                   backend=args.backend)
+        print(f"\nSaved {counts.sum()} analyzed reviews to {args.output}")
+        print_report(counts)
+        return
     
     # Analyze dataset
-    result_df = analyze_full_dataset(sample_size=args.sample)
+    result_df = analyze_full_dataset(sample_size=args.sample,
+                                     cache_path=cache_path,
+                                     token_budget=args.token_budget,
+                                     workers=args.workers,
+                                     backend=args.backend)
     
     # Save results
-    result_df.to_csv(args.output, index=False)
+    result_df = write_dataset(result_df, args.output)
     print(f"\nSaved {len(result_df)} analyzed reviews to {args.output}")
     
     # Generate summary report
-    print("\n=== SENTIMENT ANALYSIS REPORT ===")
-    print(f"Total reviews analyzed: {len(result_df)}")
-    
-    sentiment_counts = result_df['sentiment_label'].value_counts()
-    for label, count in sentiment_counts.items():
-        percentage = count / len(result_df) * 100
-        print(f"{label}: {count} ({percentage:.1f}%)")
-    
-    print("\n=== BY BANK ===")
-    for bank in result_df['bank'].unique():
-        bank_data = result_df[result_df['bank'] == bank]
-        neg_count = (bank_data['sentiment_label'] == 'NEGATIVE').sum()
-        neg_pct = neg_count / len(bank_data) * 100
-        print(f"{bank}: {len(bank_data)} reviews, {neg_count} negative ({neg_pct:.1f}%)")
+    print_report(result_df.groupby(['bank', 'sentiment_label'], observed=True).size())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,121 +1,328 @@
 # scripts/thematic_analysis.py
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.decomposition import NMF
+import heapq
+import joblib
+import os
+import time
+import warnings
+from collections import Counter
+from types import SimpleNamespace
+from scipy import sparse
+from scipy.sparse.linalg import norm as sparse_norm
+from scipy.spatial.distance import cosine
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.feature_extraction.text import (CountVectorizer, HashingVectorizer, TfidfTransformer,
+                                             TfidfVectorizer)
+from sklearn.decomposition import MiniBatchNMF
+from sklearn.preprocessing import normalize
+from dataset_io import SENTIMENT_REVIEWS, read_dataset, review_digests
+from pipeline_paths import TOKEN_STORE, TOPIC_MODEL_FILE
+from token_store import load_token_store, ngram_counts, store_rows
 
-def extract_keywords(df, n_keywords=20):
+TOPIC_FEATURES = 2 ** 16   # hashed unigram/bigram columns
+TOPIC_BATCH = 1024         # reviews per MiniBatchNMF update
+TERMS_PER_COLUMN = 3       # most frequent terms kept per hashed column, to name it
+SEEN_BITS = 2 ** 25        # Bloom filter of reviews already fed to the topic model (4 MB)
+SEEN_HASHES = 4
+
+def top_keywords(tfidf_matrix, feature_names, k):
+    """Top-k features by mean TF-IDF, without densifying the matrix"""
+    # Sparse column mean: one pass over the stored values only
+    scores = np.asarray(tfidf_matrix.mean(axis=0)).ravel()
+    k = min(k, len(scores))
+    if k == 0:
+        return []
+    
+    top = np.argpartition(-scores, k - 1)[:k]
+    # Highest score first; ties keep vocabulary order like a stable sort
+    top = top[np.lexsort((top, -scores[top]))]
+    return [(feature_names[i], scores[i]) for i in top]
+
+def build_corpus(df, store=None):
+    """
+    Unigram+bigram counts of the negative reviews, shared by every analysis.
+    Read from the token store when given, otherwise tokenized here.
+    """
+    negative = df[df['sentiment_label'] == 'NEGATIVE']
+    if store is not None:
+        counts = ngram_counts(store, store_rows(store, negative))
+        # Keep the terms that occur, in sorted order, as a fitted vectorizer would
+        columns = np.unique(counts.indices)
+        feature_names = np.array([store.ngram_vocab[c] for c in columns], dtype=object)
+        order = np.argsort(feature_names, kind='stable')
+        return SimpleNamespace(counts=counts[:, columns[order]].tocsr(),
+                               feature_names=feature_names[order],
+                               banks=negative['bank'].to_numpy())
+    
+    vectorizer = CountVectorizer(stop_words='english', ngram_range=(1, 2))
+    try:
+        counts = vectorizer.fit_transform(negative['review'].fillna(''))
+        feature_names = vectorizer.get_feature_names_out()
+    except ValueError:  # no reviews, or nothing but stop words
+        counts = sparse.csr_matrix((len(negative), 0))
+        feature_names = np.array([], dtype=object)
+    return SimpleNamespace(counts=counts.tocsr(), feature_names=feature_names,
+                           banks=negative['bank'].to_numpy())
+
+def select_tfidf(counts, rows=None, max_features=None, min_df=1, max_df=1.0):
+    """
+    TF-IDF of a row slice of the shared counts, restricted to the features a
+    TfidfVectorizer with these settings would keep if fitted on those rows.
+    Returns the matrix and the selected column indices (in vocabulary order).
+    """
+    if rows is not None:
+        counts = counts[rows]
+    n_docs = counts.shape[0]
+    
+    # Document-frequency pruning, as in the vectorizer's min_df/max_df
+    doc_freq = np.bincount(counts.indices, minlength=counts.shape[1])
+    min_count = min_df if isinstance(min_df, int) else min_df * n_docs
+    max_count = max_df if isinstance(max_df, int) else max_df * n_docs
+    columns = np.flatnonzero((doc_freq >= max(min_count, 1)) & (doc_freq <= max_count))
+    
+    # max_features keeps the most frequent terms across the slice (same argsort
+    # as the vectorizer, so ties resolve identically)
+    if max_features is not None and len(columns) > max_features:
+        term_freq = np.asarray(counts[:, columns].sum(axis=0)).ravel()
+        columns = np.sort(columns[(-term_freq).argsort()[:max_features]])
+    
+    return TfidfTransformer().fit_transform(counts[:, columns]), columns
+
+def extract_keywords(df, n_keywords=20, corpus=None):
     """Extract top keywords using TF-IDF"""
     
     # Focus on negative reviews for pain points
-    negative_reviews = df[df['sentiment_label'] == 'NEGATIVE']['review'].fillna('')
+    corpus = corpus or build_corpus(df)
     
-    if len(negative_reviews) < 10:
+    if corpus.counts.shape[0] < 10:
         return []
     
     # TF-IDF for unigrams and bigrams
-    vectorizer = TfidfVectorizer(
-        max_features=n_keywords*2,
-        stop_words='english',
-        ngram_range=(1, 2),
-        min_df=2
-    )
-    
-    tfidf_matrix = vectorizer.fit_transform(negative_reviews)
-    feature_names = vectorizer.get_feature_names_out()
+    tfidf_matrix, columns = select_tfidf(corpus.counts, max_features=n_keywords*2, min_df=2)
     
     # Get top keywords by average TF-IDF score
-    scores = np.mean(tfidf_matrix.toarray(), axis=0)
-    top_keywords = sorted(zip(feature_names, scores), 
-                         key=lambda x: x[1], reverse=True)[:n_keywords]
+    return top_keywords(tfidf_matrix, corpus.feature_names[columns], n_keywords)
+
+def topic_vectorizer():
+    """Stateless hashing features for the topic model (non-negative, as NMF needs)"""
+    return HashingVectorizer(n_features=TOPIC_FEATURES, stop_words='english',
+                             ngram_range=(1, 2), alternate_sign=False, norm='l2')
+
+def topic_features(reviews, store=None):
+    """
+    Hashed, l2-normalised n-gram features for the topic model plus the term
+    counts behind them. From the token store the stored n-gram counts are
+    folded into hash columns, which gives the same matrix as the vectorizer.
+    """
+    if store is None:
+        texts = reviews['review'].fillna('')
+        analyzer = topic_vectorizer().build_analyzer()
+        return (topic_vectorizer().transform(texts),
+                Counter(term for text in texts for term in analyzer(text)))
     
-    return top_keywords
+    counts = ngram_counts(store, store_rows(store, reviews))
+    columns = np.unique(counts.indices)
+    terms = [store.ngram_vocab[c] for c in columns]
+    hashed = np.zeros(len(store.ngram_vocab), dtype=np.int32)
+    if len(columns):
+        hashed[columns] = FeatureHasher(n_features=TOPIC_FEATURES, input_type='string',
+                                        alternate_sign=False).transform([[t] for t in terms]).indices
+    X = sparse.csr_matrix((counts.data.astype(np.float64), hashed[counts.indices], counts.indptr),
+                          shape=(counts.shape[0], TOPIC_FEATURES))
+    X.sum_duplicates()
+    term_totals = np.bincount(counts.indices, weights=counts.data, minlength=counts.shape[1])
+    return normalize(X), Counter({term: int(term_totals[c]) for term, c in zip(terms, columns)})
+
+def load_topic_model(path=TOPIC_MODEL_FILE, n_topics=4):
+    """Persisted topic model state, or None when absent, empty or built with other settings"""
+    if not os.path.exists(path):
+        return None
+    state = joblib.load(path)
+    if state['model'] is None:
+        return None
+    if (state['model'].n_components != n_topics or state['n_features'] != TOPIC_FEATURES
+            or state.get('seen_bits') != SEEN_BITS):
+        print(f"⚠️ {path} was built with different settings; rebuilding the topic model")
+        return None
+    return state
+
+def seen_positions(digests):
+    """Bloom filter bit positions of each review digest (double hashing of its two halves)"""
+    digests = np.asarray(digests, dtype=np.uint64)
+    low, high = digests & np.uint64(0xFFFFFFFF), digests >> np.uint64(32)
+    steps = np.arange(SEEN_HASHES, dtype=np.uint64)
+    return (low[:, None] + steps * high[:, None]) % np.uint64(SEEN_BITS)
+
+def is_seen(seen, digests):
+    """True for digests probably added to the filter (false positives are rare, misses never)"""
+    positions = seen_positions(digests)
+    return ((seen[positions >> np.uint64(3)] >> (positions & np.uint64(7))) & 1).all(axis=1)
 
-def topic_modeling_analysis(df, n_topics=4):
-    """Perform topic modeling using NMF"""
+def mark_seen(seen, digests):
+    """Add review digests to the Bloom filter in place"""
+    positions = seen_positions(digests).ravel()
+    np.bitwise_or.at(seen, positions >> np.uint64(3),
+                     (np.uint64(1) << (positions & np.uint64(7))).astype(np.uint8))
+
+def count_terms(state, counts):
+    """
+    Track how often each term occurs, so hashed columns can be named. Only the
+    TERMS_PER_COLUMN most frequent terms of each column are kept, which bounds
+    the map; a dropped term that comes back starts counting again from zero.
+    """
+    new_terms = [term for term in counts if term not in state['terms']]
+    if new_terms:
+        # Same hashing as the vectorizer: one term per row gives its column
+        columns = FeatureHasher(n_features=TOPIC_FEATURES, input_type='string',
+                                alternate_sign=False).transform([[t] for t in new_terms]).indices
+        for term, column in zip(new_terms, columns):
+            state['terms'][term] = [int(column), 0]
+    for term, count in counts.items():
+        state['terms'][term][1] += count
     
-    negative_reviews = df[df['sentiment_label'] == 'NEGATIVE']['review'].fillna('')
+    by_column = {}
+    for term, (column, count) in state['terms'].items():
+        by_column.setdefault(column, []).append((count, term))
+    state['terms'] = {term: [column, count] for column, entries in by_column.items()
+                      for count, term in heapq.nlargest(TERMS_PER_COLUMN, entries)}
+
+def topic_words(state, n_words=10):
+    """Top terms per topic; topic IDs are component indices, stable across updates"""
+    column_term = {}
+    for term, (column, count) in state['terms'].items():
+        if count > column_term.get(column, ('', 0))[1]:
+            column_term[column] = (term, count)
     
-    if len(negative_reviews) < 20:
-        return {}
+    topics = {}
+    for topic_idx, topic in enumerate(state['model'].components_):
+        top_columns = np.argpartition(-topic, n_words)[:n_words]
+        top_columns = top_columns[np.argsort(-topic[top_columns])]
+        topics[f'Topic_{topic_idx+1}'] = [column_term[c][0] for c in top_columns
+                                          if c in column_term and topic[c] > 0]
+    return topics
+
+def relative_error(model, X):
+    """||X - WH|| / ||X|| for a sparse batch, without materialising WH"""
+    W = model.transform(X)
+    H = model.components_
+    x_norm = sparse_norm(X) ** 2
+    error = x_norm - 2 * np.sum(W * (X @ H.T)) + np.sum((W.T @ W) * (H @ H.T))
+    return np.sqrt(max(error, 0) / x_norm) if x_norm else 0.0
+
+def topic_modeling_analysis(df, n_topics=4, model_path=TOPIC_MODEL_FILE, rebuild=False, store=None):
+    """
+    Incremental NMF topics over negative reviews. The model is persisted and
+    each run feeds it only negative reviews it has not seen before, so the
+    cost follows the delta and topic IDs stay the same between runs.
+    """
+    negative = df[df['sentiment_label'] == 'NEGATIVE']
+    state = None if rebuild else load_topic_model(model_path, n_topics)
     
-    # TF-IDF Vectorizer
-    tfidf_vectorizer = TfidfVectorizer(
-        max_features=100,
-        stop_words='english',
-        ngram_range=(1, 2),
-        min_df=3,
-        max_df=0.8
-    )
+    digests = review_digests(negative)
+    if state is not None:
+        delta = negative[~is_seen(state['seen'], digests)]
+    else:
+        delta = negative
+    print(f"  {len(delta)} new negative reviews for the topic model")
     
-    tfidf_matrix = tfidf_vectorizer.fit_transform(negative_reviews)
+    if state is None and len(delta) < 20:
+        # An empty state still records the run (the pipeline checks this file
+        # exists); the model is fitted once there are enough negative reviews
+        if not os.path.exists(model_path):
+            os.makedirs(os.path.dirname(model_path) or '.', exist_ok=True)
+            joblib.dump({'model': None}, model_path)
+        return {}
+    if state is not None and len(delta) == 0:
+        return topic_words(state)
     
-    # Apply NMF
+    X, term_counts = topic_features(delta, store)
     try:
-        nmf = NMF(n_components=n_topics, random_state=42, alpha=.1, l1_ratio=.5)
-        nmf_features = nmf.fit_transform(tfidf_matrix)
-        
-        # Get top words for each topic
-        feature_names = tfidf_vectorizer.get_feature_names_out()
-        
-        topics = {}
-        for topic_idx, topic in enumerate(nmf.components_):
-            top_features_ind = topic.argsort()[:-11:-1]
-            top_features = [feature_names[i] for i in top_features_ind]
-            topics[f'Topic_{topic_idx+1}'] = top_features
-    except:
-        topics = {}
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always', ConvergenceWarning)
+            if state is None:
+                model = MiniBatchNMF(n_components=n_topics, random_state=42, batch_size=TOPIC_BATCH,
+                                     max_iter=200)
+                model.fit(X)
+                state = {'model': model, 'n_features': TOPIC_FEATURES, 'seen_bits': SEEN_BITS,
+                         'seen': np.zeros(SEEN_BITS // 8, dtype=np.uint8), 'reviews': 0,
+                         'terms': {}}
+                print(f"  Fitted {n_topics} topics on {X.shape[0]} reviews "
+                      f"({model.n_iter_} epochs, {model.n_steps_} steps)")
+            else:
+                model = state['model']
+                previous = model.components_.copy()
+                for start in range(0, X.shape[0], TOPIC_BATCH):
+                    model.partial_fit(X[start:start + TOPIC_BATCH])
+                # How far each topic moved (1.0 = unchanged)
+                drift = [1 - cosine(before, after) for before, after
+                         in zip(previous, model.components_)]
+                print(f"  Updated topics with {X.shape[0]} reviews; similarity to previous: "
+                      f"{', '.join(f'{d:.3f}' for d in drift)}")
+        for warning in caught:
+            print(f"  ⚠️ {warning.message}")
+    except (ValueError, FloatingPointError, np.linalg.LinAlgError) as e:
+        print(f"  ❌ Topic model update failed: {e}")
+        return {}
     
-    return topics
+    error = relative_error(model, X)
+    print(f"  Relative reconstruction error on new reviews: {error:.3f}")
+    if error > 0.95:
+        print("  ⚠️ New reviews fit the existing topics poorly; consider --rebuild-topics")
+    count_terms(state, term_counts)
+    mark_seen(state['seen'], review_digests(delta))
+    state['reviews'] += len(delta)
+    
+    os.makedirs(os.path.dirname(model_path) or '.', exist_ok=True)
+    joblib.dump(state, model_path)
+    return topic_words(state)
 
-def analyze_by_bank(df):
+def analyze_by_bank(df, corpus=None):
     """Analyze keywords separately for each bank"""
+    corpus = corpus or build_corpus(df)
     banks = df['bank'].unique()
     bank_keywords = {}
     
     for bank in banks:
-        bank_reviews = df[df['bank'] == bank]
-        bank_negative = bank_reviews[bank_reviews['sentiment_label'] == 'NEGATIVE']
+        # Row slice of the shared counts instead of refitting per bank
+        rows = np.flatnonzero(corpus.banks == bank)
         
-        if len(bank_negative) < 5:
+        if len(rows) < 5:
             bank_keywords[bank] = []
             continue
         
-        vectorizer = TfidfVectorizer(
-            max_features=10,
-            stop_words='english',
-            ngram_range=(1, 2)
-        )
-        
-        tfidf_matrix = vectorizer.fit_transform(bank_negative['review'].fillna(''))
-        feature_names = vectorizer.get_feature_names_out()
-        scores = np.mean(tfidf_matrix.toarray(), axis=0)
-        
-        top_keywords = sorted(zip(feature_names, scores), 
-                            key=lambda x: x[1], reverse=True)[:8]
-        
-        bank_keywords[bank] = top_keywords
+        tfidf_matrix, columns = select_tfidf(corpus.counts, rows=rows, max_features=10)
+        bank_keywords[bank] = top_keywords(tfidf_matrix, corpus.feature_names[columns], 8)
     
     return bank_keywords
 
-def main():
-    # Load sentiment data
-    df = pd.read_csv('data/full_sentiment_analysis.csv')
-    
+def run_thematic_analysis(df, rebuild_topics=False, token_store=TOKEN_STORE):
+    """Print keywords, topics, bank keywords and business themes for negative reviews"""
     print("=== ADVANCED THEMATIC ANALYSIS ===")
     print(f"Total reviews: {len(df)}")
     print(f"Negative reviews: {len(df[df['sentiment_label'] == 'NEGATIVE'])}")
     
+    # Keywords and topics read their n-gram counts from the store the tokenize
+    # stage keeps; without it (or with reviews it lacks) the text is tokenized here
+    store = load_token_store(token_store) if token_store else None
+    try:
+        corpus = build_corpus(df, store)
+    except KeyError as e:
+        print(f"⚠️ {e}; tokenizing review text")
+        store = None
+        corpus = build_corpus(df)
+    
     # 1. Overall keyword extraction
     print("\n1. TOP KEYWORDS FROM NEGATIVE REVIEWS:")
-    top_keywords = extract_keywords(df, n_keywords=15)
+    negative_keywords = extract_keywords(df, n_keywords=15, corpus=corpus)
     
-    for i, (keyword, score) in enumerate(top_keywords, 1):
+    for i, (keyword, score) in enumerate(negative_keywords, 1):
         print(f"  {i:2d}. {keyword:20s} {score:.4f}")
     
     # 2. Topic modeling
     print("\n2. TOPIC MODELING (NMF):")
-    topics = topic_modeling_analysis(df, n_topics=4)
+    topics = topic_modeling_analysis(df, n_topics=4, rebuild=rebuild_topics, store=store)
     
     if topics:
         for topic_name, words in topics.items():
@@ -126,7 +333,7 @@ def main():
     
     # 3. Bank-specific analysis
     print("\n3. BANK-SPECIFIC KEYWORDS:")
-    bank_keywords = analyze_by_bank(df)
+    bank_keywords = analyze_by_bank(df, corpus=corpus)
     
     for bank, keywords in bank_keywords.items():
         if keywords:
@@ -149,7 +356,7 @@ def main():
     for theme, terms in themes.items():
         print(f"\n  {theme}:")
         matching_keywords = []
-        for keyword, score in top_keywords:
+        for keyword, score in negative_keywords:
             if any(term in keyword for term in terms):
                 matching_keywords.append((keyword, score))
         
@@ -158,6 +365,80 @@ def main():
                 print(f"    - {keyword} (score: {score:.4f})")
         else:
             print(f"    No direct matches in top keywords")
+    
+    return {'keywords': negative_keywords, 'topics': topics, 'bank_keywords': bank_keywords}
+
+def synthetic_corpus(n_reviews, vocab_size=20000, seed=42):
+    """Random reviews with a Zipf-like word distribution, for benchmarks"""
+    rng = np.random.default_rng(seed)
+    vocab = np.array([f"w{i}" for i in range(vocab_size)])
+    lengths = rng.integers(5, 40, size=n_reviews)
+    words = vocab[np.minimum(rng.zipf(1.3, size=lengths.sum()) - 1, vocab_size - 1)]
+    bounds = np.cumsum(lengths)[:-1]
+    return [' '.join(review) for review in np.split(words, bounds)]
+
+def benchmark_keyword_scoring(n_reviews=1_000_000, max_features=5000, n_keywords=20):
+    """Compare dense (toarray + np.mean) and sparse keyword scoring on a synthetic corpus"""
+    print(f"Building synthetic corpus of {n_reviews:,} reviews...")
+    corpus = synthetic_corpus(n_reviews)
+    vectorizer = TfidfVectorizer(max_features=max_features, ngram_range=(1, 2), min_df=2)
+    start = time.perf_counter()
+    tfidf_matrix = vectorizer.fit_transform(corpus)
+    feature_names = vectorizer.get_feature_names_out()
+    print(f"Vectorized in {time.perf_counter() - start:.1f}s: {tfidf_matrix.shape}, "
+          f"{tfidf_matrix.nnz:,} non-zeros "
+          f"({tfidf_matrix.data.nbytes / 1e6:.0f} MB of values)")
+    
+    start = time.perf_counter()
+    sparse_top = top_keywords(tfidf_matrix, feature_names, n_keywords)
+    sparse_time = time.perf_counter() - start
+    print(f"Sparse mean + argpartition: {sparse_time:.3f}s, no dense copy")
+    
+    dense_bytes = tfidf_matrix.shape[0] * tfidf_matrix.shape[1] * 8
+    try:
+        available = os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        available = None
+    if available is not None and dense_bytes > 0.8 * available:
+        # Don't let the kernel OOM-kill the benchmark instead of raising MemoryError
+        print(f"❌ toarray + np.mean: skipped, needs {dense_bytes / 1e9:.1f} GB "
+              f"({available / 1e9:.1f} GB available)")
+        return
+    
+    try:
+        start = time.perf_counter()
+        scores = np.mean(tfidf_matrix.toarray(), axis=0)
+        dense_top = sorted(zip(feature_names, scores), key=lambda x: x[1], reverse=True)[:n_keywords]
+        dense_time = time.perf_counter() - start
+    except MemoryError:
+        print(f"❌ toarray + np.mean: out of memory (needs {dense_bytes / 1e9:.1f} GB)")
+        return
+    
+    print(f"toarray + np.mean:          {dense_time:.3f}s, "
+          f"{dense_bytes / 1e9:.1f} GB dense copy")
+    print(f"Speedup: {dense_time / sparse_time:.0f}x")
+    same = [k for k, _ in sparse_top] == [k for k, _ in dense_top]
+    print(f"{'✅' if same else '⚠️'} Top-{n_keywords} keywords {'identical' if same else 'differ'}")
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Keyword and topic analysis of negative reviews')
+    parser.add_argument('--rebuild-topics', action='store_true',
+                       help=f'Refit the topic model from scratch instead of updating {TOPIC_MODEL_FILE}')
+    parser.add_argument('--benchmark', type=int, nargs='?', const=1_000_000, default=None,
+                       metavar='N_REVIEWS',
+                       help='Benchmark dense vs sparse keyword scoring on a synthetic corpus '
+                            '(default size: 1,000,000) and exit')
+    args = parser.parse_args()
+    
+    if args.benchmark:
+        benchmark_keyword_scoring(args.benchmark)
+        return
+    
+    # Load sentiment data (only the columns used here)
+    df = read_dataset(SENTIMENT_REVIEWS, columns=['review', 'bank', 'sentiment_label'])
+    run_thematic_analysis(df, rebuild_topics=args.rebuild_topics)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
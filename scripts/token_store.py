@@ -0,0 +1,188 @@
+# scripts/token_store.py
+import json
+import os
+import shutil
+from collections import Counter
+from types import SimpleNamespace
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer, ENGLISH_STOP_WORDS
+from dataset_io import SENTIMENT_REVIEWS, read_dataset, review_digests
+from pipeline_paths import TOKEN_STORE
+
+STORE_VERSION = 2
+# Memory-mapped arrays: review digests, the token ID stream (a CSR matrix
+# without values: offsets are its indptr) and stop-word-filtered
+# unigram+bigram counts as a CSR matrix. Each is a raw append-only file;
+# meta.json records how much of every file is committed
+ARRAYS = {'digests': np.uint64, 'offsets': np.int64, 'token_ids': np.int32,
+          'ngram_indptr': np.int64, 'ngram_indices': np.int32, 'ngram_counts': np.int32}
+TERMS = ['vocab', 'ngram_vocab']
+
+def word_ngrams(tokens):
+    """Unigrams and bigrams after English stop-word removal (the thematic vectorizers' analyzer)"""
+    kept = [t for t in tokens if t not in ENGLISH_STOP_WORDS]
+    return kept + [f"{a} {b}" for a, b in zip(kept, kept[1:])]
+
+def read_terms(path, size):
+    with open(path, 'rb') as f:
+        text = f.read(size).decode('utf-8')
+    return text.split('\n')[:-1]
+
+def map_array(path, dtype, size):
+    if not size:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(size // np.dtype(dtype).itemsize,))
+
+def load_token_store(path=TOKEN_STORE):
+    """Open the store with its arrays memory-mapped, or None when absent or outdated"""
+    meta_path = os.path.join(path, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta.get('version') != STORE_VERSION:
+        print(f"⚠️ {path} has an old layout; it will be rebuilt")
+        return None
+    
+    sizes = meta['sizes']
+    store = {name: map_array(os.path.join(path, name + '.bin'), dtype, sizes[name])
+             for name, dtype in ARRAYS.items()}
+    store.update({name: read_terms(os.path.join(path, name + '.txt'), sizes[name])
+                  for name in TERMS})
+    return SimpleNamespace(path=path, sizes=sizes, **store)
+
+def append_token_store(path, sizes, chunks):
+    """
+    Append new rows to every file of the store, then commit them by rewriting
+    meta.json. Bytes past the committed sizes (left by an interrupted update)
+    are cut off first, so readers never see a half-written segment.
+    """
+    os.makedirs(path, exist_ok=True)
+    sizes = dict(sizes)
+    for name, data in chunks.items():
+        with open(os.path.join(path, name + ('.txt' if name in TERMS else '.bin')), 'ab') as f:
+            f.truncate(sizes.get(name, 0))
+            f.write(data)
+        sizes[name] = sizes.get(name, 0) + len(data)
+    
+    meta_path = os.path.join(path, 'meta.json')
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump({'version': STORE_VERSION, 'sizes': sizes}, f, indent=2)
+    os.replace(meta_path + '.tmp', meta_path)
+
+def update_token_store(df, path=TOKEN_STORE):
+    """
+    Tokenize the reviews the store has not seen (by bank + text digest) and
+    append them. Existing reviews keep their rows and terms keep their IDs;
+    only the new rows are written.
+    """
+    store = load_token_store(path)
+    if store is None and os.path.isdir(path):
+        shutil.rmtree(path)
+    digests = review_digests(df)
+    known = store.digests if store is not None else np.array([], dtype=np.uint64)
+    _, first = np.unique(digests, return_index=True)
+    new = np.sort(first[~np.isin(digests[first], known)])
+    if store is not None and not len(new):
+        print(f"✅ Token store up to date ({len(known)} reviews)")
+        return store
+    
+    vocab = {term: i for i, term in enumerate(store.vocab if store is not None else [])}
+    ngram_vocab = {term: i for i, term in enumerate(store.ngram_vocab if store is not None else [])}
+    old_vocab, old_ngram_vocab = len(vocab), len(ngram_vocab)
+    
+    # Same preprocessing and token pattern as the scikit-learn vectorizers
+    vectorizer = CountVectorizer()
+    preprocess, tokenize = vectorizer.build_preprocessor(), vectorizer.build_tokenizer()
+    
+    token_ids, lengths = [], []
+    ngram_indices, ngram_counts, ngram_lengths = [], [], []
+    for text in df['review'].fillna('').astype(str).to_numpy()[new]:
+        tokens = tokenize(preprocess(text))
+        token_ids.extend(vocab.setdefault(t, len(vocab)) for t in tokens)
+        lengths.append(len(tokens))
+        grams = Counter(ngram_vocab.setdefault(g, len(ngram_vocab)) for g in word_ngrams(tokens))
+        ngram_indices.extend(grams.keys())
+        ngram_counts.extend(grams.values())
+        ngram_lengths.append(len(grams))
+    
+    def indptr(old, row_lengths):
+        # A new store starts its indptr at 0; later segments continue from the last entry
+        start = np.array([0]) if store is None else np.array([], dtype=np.int64)
+        base = 0 if store is None else getattr(store, old)[-1]
+        return np.concatenate([start, base + np.cumsum(row_lengths, dtype=np.int64)])
+    
+    def terms(vocabulary, old):
+        return ''.join(term + '\n' for term in list(vocabulary)[old:]).encode('utf-8')
+    
+    arrays = {
+        'digests': digests[new],
+        'offsets': indptr('offsets', lengths),
+        'token_ids': token_ids,
+        'ngram_indptr': indptr('ngram_indptr', ngram_lengths),
+        'ngram_indices': ngram_indices,
+        'ngram_counts': ngram_counts,
+    }
+    chunks = {name: np.asarray(values, dtype=ARRAYS[name]).tobytes()
+              for name, values in arrays.items()}
+    chunks.update(vocab=terms(vocab, old_vocab), ngram_vocab=terms(ngram_vocab, old_ngram_vocab))
+    append_token_store(path, store.sizes if store is not None else {}, chunks)
+    
+    store = load_token_store(path)
+    print(f"✅ Tokenized {len(new)} new reviews into {path} ({len(store.digests)} reviews, "
+          f"{len(vocab)} words, {len(ngram_vocab)} n-grams)")
+    return store
+
+def store_rows(store, df):
+    """Store row of each review; raises KeyError for reviews not tokenized yet"""
+    return rows_for_digests(store, review_digests(df))
+
+def rows_for_digests(store, digests):
+    """Store row of each review digest; raises KeyError for digests not in the store"""
+    if not len(digests):
+        return np.array([], dtype=np.int64)
+    if not len(store.digests):
+        raise KeyError(f"{len(digests)} reviews are not in {store.path}; run update_token_store first")
+    
+    order = np.argsort(store.digests)
+    positions = np.searchsorted(store.digests, digests, sorter=order)
+    rows = order[np.minimum(positions, len(order) - 1)]
+    missing = np.count_nonzero(store.digests[rows] != digests)
+    if missing:
+        raise KeyError(f"{missing} reviews are not in {store.path}; run update_token_store first")
+    return rows
+
+def _row_slice(indptr, indices, data, rows, n_columns):
+    """CSR matrix of selected rows, copying only those rows out of the memory maps"""
+    rows = np.asarray(rows, dtype=np.int64)
+    starts, lengths = indptr[rows], indptr[rows + 1] - indptr[rows]
+    new_indptr = np.concatenate([[0], np.cumsum(lengths)])
+    take = np.repeat(starts - new_indptr[:-1], lengths) + np.arange(new_indptr[-1])
+    values = np.ones(len(take), dtype=np.int32) if data is None else data[take]
+    return sparse.csr_matrix((values, indices[take], new_indptr), shape=(len(rows), n_columns))
+
+def token_counts(store, rows):
+    """Word counts (rows x vocab) of the given store rows"""
+    matrix = _row_slice(store.offsets, store.token_ids, None, rows, len(store.vocab))
+    matrix.sum_duplicates()
+    return matrix
+
+def ngram_counts(store, rows):
+    """Stop-word-filtered unigram+bigram counts (rows x n-gram vocab) of the given store rows"""
+    return _row_slice(store.ngram_indptr, store.ngram_indices, store.ngram_counts, rows,
+                      len(store.ngram_vocab))
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Tokenize analyzed reviews into the shared token store')
+    parser.add_argument('--path', default=TOKEN_STORE,
+                       help=f'Store directory (default: {TOKEN_STORE})')
+    args = parser.parse_args()
+    
+    df = read_dataset(SENTIMENT_REVIEWS, columns=['review', 'bank'])
+    update_token_store(df, args.path)
+
+if __name__ == "__main__":
+    main()
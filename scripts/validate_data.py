@@ -1,7 +1,8 @@
 import pandas as pd
+from dataset_io import CLEANED_REVIEWS, read_dataset
 
 def validate_data():
-    df = pd.read_csv('data/cleaned_bank_reviews.csv')
+    df = read_dataset(CLEANED_REVIEWS, columns=['bank', 'date', 'rating'])
     
     print("=== DATA VALIDATION ===")
     print(f"Total reviews: {len(df)}")
@@ -0,0 +1,37 @@
+import pytest
+
+WORDS = ("the app is not working and my transfer failed again after the update "
+         "login otp crash très lent money balance customer service").split()
+
+
+@pytest.fixture
+def make_reviews():
+    """
+    Factory of analyzed reviews: make_reviews(n, start='2024-01-01', seed=None).
+    Reviews are six hours apart, rotate over three banks, and odd rows are
+    positive, even rows negative. Without a seed positive rows praise transfers
+    and negative ones report login failures; with a seed every review is a
+    random run of words.
+    """
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    banks = ['Commercial Bank of Ethiopia', 'Bank of Abyssinia', 'Dashen Bank']
+
+    def make(n, start='2024-01-01', seed=None):
+        dates = pd.date_range(start, periods=n, freq='6h')
+        if seed is None:
+            # The timestamp keeps reviews from different starts apart
+            reviews = [f"{'transfer works great' if i % 2 else 'login keeps failing'} {i} "
+                       f"{day:%Y%m%d%H}" for i, day in enumerate(dates)]
+        else:
+            rng = np.random.default_rng(seed)
+            reviews = [' '.join(rng.choice(WORDS, rng.integers(1, 12))) for _ in range(n)]
+        return pd.DataFrame({
+            'review': reviews,
+            'rating': [i % 5 + 1 for i in range(n)],
+            'date': [str(day.date()) for day in dates],
+            'bank': [banks[i % 3] for i in range(n)],
+            'sentiment_label': ['POSITIVE' if i % 2 else 'NEGATIVE' for i in range(n)],
+            'sentiment_score': [round(0.5 + i % 5 / 10, 4) for i in range(n)],
+        })
+    return make
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("scipy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+import clean_data
+
+
+def test_normalize_ignores_case_whitespace_and_emoji():
+    normalized = clean_data.normalize_reviews(pd.Series([
+        "Worst  app EVER!!! 😡", "worst app ever", None]))
+
+    assert normalized.tolist() == ["worst app ever", "worst app ever", ""]
+
+
+def test_emoji_only_reviews_are_not_duplicates_of_each_other():
+    df = pd.DataFrame({
+        'review': ["👍", "😡", "👍", "!!!", "Great app 👍", "great app"],
+        'bank': ['Dashen Bank'] * 6,
+    })
+
+    assert clean_data.exact_duplicates(df).tolist() == [False, False, True, False, False, True]
+    assert not clean_data.flag_near_duplicates(df[~clean_data.exact_duplicates(df)]).any()
+
+
+def test_near_duplicates_are_flagged_within_a_bank():
+    df = pd.DataFrame({
+        'review': ["This app is terrible, it crashes every time I log in!!",
+                   "this app is TERRIBLE it crashes every time i log in 😡😡",
+                   "Great app, transfers are fast and easy",
+                   "This app is terrible, it crashes every time I log in!!"],
+        'bank': ['Dashen Bank', 'Dashen Bank', 'Dashen Bank', 'Bank of Abyssinia'],
+    })
+
+    flags = clean_data.flag_near_duplicates(df)
+
+    assert flags.tolist() == [False, True, False, False]
+
+
+def test_signatures_estimate_similarity():
+    a = "the app keeps crashing when i try to transfer money to another account"
+    b = "the app keeps crashing when i try to transfer money to another bank account"
+    c = "customer service answered quickly and solved my problem"
+    signatures = clean_data.minhash_signatures([a, b, c, ""])
+
+    assert (signatures[0] == signatures[1]).mean() > 0.6
+    assert (signatures[0] == signatures[2]).mean() < 0.2
+    assert (signatures[3] == signatures[3].max()).all()
@@ -0,0 +1,93 @@
+import os
+import sys
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+import database_setup
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = database_setup.create_connection('sqlite', sqlite_path=str(tmp_path / 'reviews.db'))
+    assert database_setup.create_tables(conn)
+    yield conn
+    conn.close()
+
+
+def count_reviews(conn):
+    return conn.execute("SELECT COUNT(*) FROM reviews").fetchone()[0]
+
+
+def test_repeated_loads_are_idempotent(conn, capsys, make_reviews):
+    df = make_reviews(30)
+    assert database_setup.insert_data(conn, df=df)
+    assert database_setup.insert_data(conn, df=df, full=True)
+
+    assert count_reviews(conn) == 30
+    assert "0 new, 0 changed, 30 unchanged" in capsys.readouterr().out
+
+    # Re-scored reviews are updated in place, not inserted again
+    df.loc[:4, 'sentiment_label'] = 'NEUTRAL'
+    assert database_setup.insert_data(conn, df=df, full=True)
+
+    assert count_reviews(conn) == 30
+    assert "0 new, 5 changed, 25 unchanged" in capsys.readouterr().out
+
+
+def test_delta_starts_at_each_banks_watermark(conn, make_reviews):
+    assert database_setup.insert_data(conn, df=make_reviews(12, start='2024-01-01'))
+    cur = conn.cursor()
+    watermarks = database_setup.load_watermarks(cur)
+    bank_map = dict(cur.execute("SELECT bank_name, bank_id FROM banks").fetchall())
+
+    # Reviews from the last loaded day may still be new; older ones are skipped
+    assert set(watermarks.values()) == {'2024-01-03'}
+    df = pd.concat([make_reviews(12), make_reviews(9, start='2024-01-03')])
+    reviews = database_setup.prepare_reviews(df, bank_map)
+    delta = database_setup.filter_delta(reviews, watermarks)
+    assert sorted(delta['review_text']) == sorted(df.loc[df['date'] >= '2024-01-03', 'review'])
+    assert len(delta) == 4 + 9
+
+    database_setup.update_watermarks(cur, delta)
+    latest = df.groupby(df['bank'].map(bank_map))['date'].max().to_dict()
+    assert database_setup.load_watermarks(cur) == latest
+    # An older batch never moves a watermark back
+    database_setup.update_watermarks(cur, reviews.head(3))
+    assert database_setup.load_watermarks(cur) == latest
+
+
+def test_rollup_totals_match_a_groupby_of_the_reviews(conn, make_reviews):
+    first, second = make_reviews(40), make_reviews(25, start='2024-01-11')
+    second.loc[0, 'rating'] = None
+    assert database_setup.insert_data(conn, df=first)
+    assert database_setup.insert_data(conn, df=second)
+
+    rollup = pd.read_sql_query("""
+        SELECT b.bank_name AS bank, d.sentiment_label, SUM(d.review_count) AS reviews,
+               SUM(d.score_sum) AS score_sum
+        FROM review_daily_rollup d JOIN banks b ON b.bank_id = d.bank_id
+        GROUP BY b.bank_name, d.sentiment_label
+    """, conn).set_index(['bank', 'sentiment_label']).sort_index()
+    df = pd.concat([first, second])
+    expected = df.groupby(['bank', 'sentiment_label']).agg(
+        reviews=('review', 'size'), score_sum=('sentiment_score', 'sum')).sort_index()
+
+    assert rollup['reviews'].tolist() == expected['reviews'].tolist()
+    assert rollup['score_sum'].to_numpy() == pytest.approx(expected['score_sum'].to_numpy())
+
+
+def test_shared_statements_take_each_backends_fragments(conn):
+    query = "CREATE TABLE t (id {serial_key}); SELECT 1{numeric} WHERE x = {param}"
+
+    assert database_setup.backend_sql(query, conn) == \
+        "CREATE TABLE t (id INTEGER PRIMARY KEY); SELECT 1 WHERE x = ?"
+    assert database_setup.backend_sql(query, object()) == \
+        "CREATE TABLE t (id SERIAL PRIMARY KEY); SELECT 1::numeric WHERE x = %s"
+    # Text outside the placeholders is never touched
+    assert database_setup.backend_sql("SELECT 'SERIAL PRIMARY KEY %s'", conn) == \
+        "SELECT 'SERIAL PRIMARY KEY %s'"
+    with pytest.raises(KeyError):
+        database_setup.backend_sql("SELECT {missing}", conn)
@@ -0,0 +1,102 @@
+import os
+import sys
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+import dataset_io
+
+
+@pytest.fixture
+def reviews():
+    return pd.DataFrame({
+        'review': ['app crashes', 'great app', 'slow transfer', 'ok'],
+        'rating': [1, 5, 2, 3],
+        'date': ['2024-01-03', '2024-02-10', '2024-02-11', None],
+        'bank': ['Dashen Bank', 'Bank of Abyssinia', 'Dashen Bank', 'Bank of Abyssinia'],
+        'source': 'Google Play',
+        'sentiment_label': ['NEGATIVE', 'POSITIVE', 'NEGATIVE', 'POSITIVE'],
+    })
+
+
+def test_round_trip_partitions_by_bank_and_month(reviews, tmp_path):
+    path = str(tmp_path / 'reviews.csv')
+    dataset_io.write_dataset(reviews, path)
+
+    partitions = sorted(os.listdir(dataset_io.parquet_path(path)))
+    assert len(partitions) == 2
+    df = dataset_io.read_dataset(path)
+    assert len(df) == 4
+    assert 'month' not in df
+    assert pd.api.types.is_datetime64_any_dtype(df['date'])
+    for column in dataset_io.CATEGORICAL_COLUMNS:
+        assert df[column].dtype == 'category'
+
+
+def test_read_projects_columns_and_filters_banks(reviews, tmp_path):
+    path = str(tmp_path / 'reviews.csv')
+    dataset_io.write_dataset(reviews, path)
+
+    df = dataset_io.read_dataset(path, columns=['review', 'bank'], banks=['Dashen Bank'])
+
+    assert sorted(df.columns) == ['bank', 'review']
+    assert sorted(df['review']) == ['app crashes', 'slow transfer']
+    assert list(df['bank'].cat.categories) == ['Dashen Bank']
+
+
+def test_rewriting_a_part_replaces_it(reviews, tmp_path):
+    path = str(tmp_path / 'reviews.csv')
+    dataset_io.write_dataset(reviews.iloc[:2], path, part=0, csv=False)
+    dataset_io.write_dataset(reviews.iloc[2:], path, part=1, csv=False)
+    dataset_io.write_dataset(reviews.iloc[2:], path, part=1, csv=False)
+
+    assert len(dataset_io.read_dataset(path)) == 4
+
+
+def test_csv_fallback_without_parquet(reviews, tmp_path):
+    path = str(tmp_path / 'reviews.csv')
+    reviews.to_csv(path, index=False)
+
+    df = dataset_io.read_dataset(path, columns=['bank', 'date'])
+
+    assert df['bank'].dtype == 'category'
+    assert df['date'].isna().sum() == 1
+
+    # Banks are filtered on even when the bank column is not returned
+    df = dataset_io.read_dataset(path, columns=['review'], banks=['Dashen Bank'])
+    assert list(df.columns) == ['review']
+    assert sorted(df['review']) == ['app crashes', 'slow transfer']
+
+
+def test_csv_is_written_only_when_asked_for(reviews, tmp_path):
+    path = str(tmp_path / 'reviews.csv')
+    dataset_io.write_dataset(reviews, path, csv=True)
+    assert dataset_io.dataset_files(path, csv=True) == [path, dataset_io.parquet_path(path)]
+    assert os.path.exists(path)
+
+    # Replacing the dataset without a CSV removes the stale one
+    dataset_io.write_dataset(reviews.iloc[:2], path)
+    assert not os.path.exists(path)
+    assert len(dataset_io.read_dataset(path)) == 2
+
+
+def test_parts_share_one_schema_whatever_each_chunk_holds(reviews, tmp_path):
+    path = str(tmp_path / 'sentiment.csv')
+    scored = reviews.assign(sentiment_score=0.9, sentiment_error=None)
+    failed = scored.iloc[2:].assign(rating=[None, 4], sentiment_label=['FAILED', 'POSITIVE'],
+                                    sentiment_score=[float('nan'), 0.8],
+                                    sentiment_error=['RuntimeError: bad input', None])
+
+    # The first part has no failures, so its error column is all None
+    dataset_io.write_dataset(scored.iloc[:2], path, part=0, csv=False)
+    dataset_io.write_dataset(failed, path, part=1, csv=False)
+
+    df = dataset_io.read_dataset(path).set_index('review')
+    assert len(df) == 4
+    assert df.loc['slow transfer', 'sentiment_error'] == 'RuntimeError: bad input'
+    assert df['sentiment_error'].isna().sum() == 3
+    assert df['rating'].isna().sum() == 1
+    assert sorted(df['sentiment_label'].cat.categories) == ['FAILED', 'NEGATIVE', 'POSITIVE']
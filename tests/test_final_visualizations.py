@@ -0,0 +1,109 @@
+import os
+import sys
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("matplotlib")
+pytest.importorskip("seaborn")
+pytest.importorskip("wordcloud")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+import final_visualizations
+import pipeline_paths
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_render_charts_writes_every_chart_in_the_requested_format(tmp_path, monkeypatch, workers,
+                                                                  make_reviews):
+    monkeypatch.setattr(pipeline_paths, 'OUTPUT_DIR', str(tmp_path))
+    # Two months of reviews, so the trend chart has more than one point
+    df = final_visualizations.load_data(make_reviews(240))
+
+    results = final_visualizations.render_charts(
+        df, final_visualizations.build_summary_cube(df), fmt='svg', dpi=20, workers=workers)
+
+    assert set(results) == set(final_visualizations.CHARTS)
+    assert sorted(os.listdir(tmp_path)) == sorted(f"{name}.svg" for name in final_visualizations.CHARTS)
+    top_positive, _ = results['wordclouds']
+    assert top_positive[0][0] in {'transfer', 'works', 'great'}
+    assert results['rating_distribution_by_bank']['Dashen Bank']['total_reviews'] == 80
+
+
+def test_summary_cube_matches_per_bank_statistics(make_reviews):
+    df = final_visualizations.load_data(make_reviews(90))
+    df.loc[0, 'rating'] = None  # unrated reviews count towards totals only
+
+    cube = final_visualizations.build_summary_cube(df)
+    summary = final_visualizations.bank_summary(cube)
+    insights = final_visualizations.rating_insights_from(summary)
+
+    assert cube['review_count'].sum() == len(df)
+    for bank, bank_data in df.groupby('bank', observed=True):
+        assert insights[bank]['total_reviews'] == len(bank_data)
+        assert insights[bank]['avg_rating'] == pytest.approx(bank_data['rating'].mean())
+        assert insights[bank]['5_star_pct'] == pytest.approx((bank_data['rating'] == 5).mean() * 100)
+        assert summary.loc[bank, 'negative'] == (bank_data['sentiment_label'] == 'NEGATIVE').sum()
+
+
+def test_token_counts_do_not_depend_on_chunking(make_reviews):
+    df = make_reviews(30)
+    df.loc[0, 'review'] = None
+
+    whole = final_visualizations.count_tokens(df)
+    chunked = final_visualizations.count_tokens(df, chunk_size=7)
+
+    assert whole.sort_index().equals(chunked.sort_index())
+    assert whole[('POSITIVE', 'Bank of Abyssinia', 'transfer')] == 5
+    top = final_visualizations.get_top_words(whole, 'NEGATIVE', n=3)
+    assert {word for word, _ in top} == {'login', 'keeps', 'failing'}
+    assert final_visualizations.get_top_words(whole, 'NEGATIVE', bank='Dashen Bank')[0][1] == 5
+
+
+def test_token_counts_from_the_token_store_match_the_text(tmp_path, make_reviews):
+    token_store = pytest.importorskip("token_store")
+    df = make_reviews(45)
+    store = token_store.update_token_store(df, str(tmp_path / 'store'))
+
+    expected = final_visualizations.count_tokens(df)
+    counts = final_visualizations.count_tokens(df, store=store)
+
+    assert counts.sort_index().equals(expected.sort_index())
+
+
+def test_token_counts_read_from_a_review_corpus(tmp_path, make_reviews):
+    review_corpus = pytest.importorskip("review_corpus")
+    token_store = pytest.importorskip("token_store")
+    df = make_reviews(45)
+    corpus = review_corpus.write_corpus(df, str(tmp_path / 'corpus'))
+    store = token_store.update_token_store(df, str(tmp_path / 'store'))
+
+    expected = final_visualizations.count_tokens(df).sort_index()
+
+    assert final_visualizations.count_tokens(corpus, chunk_size=10).sort_index().equals(expected)
+    assert final_visualizations.count_tokens(corpus, store=store).sort_index().equals(expected)
+
+
+def test_trends_use_the_database_rollup_only_when_asked_and_it_matches(tmp_path, make_reviews):
+    database_setup = pytest.importorskip("database_setup")
+    reviews = make_reviews(60)
+    cube = final_visualizations.build_summary_cube(final_visualizations.load_data(reviews))
+    db_path = str(tmp_path / 'reviews.db')
+
+    conn = database_setup.create_connection('sqlite', sqlite_path=db_path)
+    conn.execute("CREATE TABLE unrelated (x INTEGER)")
+    conn.commit()
+    # No rollup table yet: fall back to the cube instead of failing
+    assert final_visualizations.load_trend_cube(cube, db_path) is cube
+
+    assert database_setup.create_tables(conn)
+    assert database_setup.insert_data(conn, df=reviews)
+    assert final_visualizations.load_trend_cube(cube, db_path=None) is cube
+    rollup = final_visualizations.load_trend_cube(cube, db_path)
+    assert rollup is not cube
+    assert rollup['review_count'].sum() == 60
+
+    # The database holds reviews the charts do not (e.g. a sampled sentiment run)
+    assert database_setup.insert_data(conn, df=make_reviews(90).tail(30))
+    conn.close()
+    assert final_visualizations.load_trend_cube(cube, db_path) is cube
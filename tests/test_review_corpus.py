@@ -0,0 +1,44 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+import review_corpus
+
+
+def test_corpus_round_trips_text_and_columns(tmp_path):
+    df = pd.DataFrame({
+        'review': ['Great app 👍', None, '', 'ቀርፋፋ ነው', 'slow\nlogin'],
+        'rating': [5, 1, None, 2, 3],
+        'date': pd.to_datetime(['2024-01-01', '2024-02-03', None, '2024-03-04', '2024-04-05']),
+        'bank': ['Dashen Bank', 'Bank of Abyssinia', 'Dashen Bank', None, 'Dashen Bank'],
+        'sentiment_label': ['POSITIVE', 'NEGATIVE', 'NEGATIVE', 'NEGATIVE', 'NEGATIVE'],
+        'sentiment_score': [0.99, 0.8, 0.5, 0.7, 0.9],
+    })
+
+    review_corpus.write_corpus(df, str(tmp_path))
+    corpus = review_corpus.ReviewCorpus(str(tmp_path))
+
+    assert len(corpus) == 5
+    assert corpus.texts() == ['Great app 👍', '', '', 'ቀርፋፋ ነው', 'slow\nlogin']
+    assert corpus.texts(3, 10) == ['ቀርፋፋ ነው', 'slow\nlogin']
+    assert isinstance(corpus.arrays['rating'], np.memmap)
+
+    frame = corpus.frame(start=1, stop=4)
+    assert list(frame['bank'][:2]) == ['Bank of Abyssinia', 'Dashen Bank']
+    assert pd.isna(frame['bank'][2])
+    assert np.isnan(frame['rating'][1]) and frame['rating'][2] == 2
+    assert pd.isna(frame['date'][1]) and frame['date'][0] == pd.Timestamp('2024-02-03')
+    assert frame['sentiment_score'][0] == pytest.approx(0.8)
+
+
+def test_empty_corpus(tmp_path):
+    review_corpus.write_corpus(pd.DataFrame({'review': []}), str(tmp_path))
+    corpus = review_corpus.ReviewCorpus(str(tmp_path))
+
+    assert len(corpus) == 0
+    assert corpus.texts() == []
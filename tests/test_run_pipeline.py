@@ -0,0 +1,112 @@
+import ast
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pandas")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+import run_pipeline
+
+
+def make_spec(tmp_path, params=None):
+    data = tmp_path / 'input.csv'
+    code = tmp_path / 'stage.py'
+    if not data.exists():
+        data.write_text('review,bank\nok,Dashen Bank\n')
+        code.write_text('x = 1\n')
+    return {'inputs': [str(data)], 'outputs': [], 'params': params or {}, 'code': [str(code)]}
+
+
+def test_fingerprint_is_stable_for_unchanged_inputs(tmp_path):
+    spec = make_spec(tmp_path)
+    hash_cache = {}
+
+    first = run_pipeline.stage_fingerprint(spec, hash_cache)
+    os.utime(spec['inputs'][0])  # new mtime, same content
+
+    assert run_pipeline.stage_fingerprint(spec, hash_cache) == first
+
+
+def test_fingerprint_changes_with_content_params_and_code(tmp_path):
+    spec = make_spec(tmp_path, {'sample': 2000})
+    hash_cache = {}
+    base = run_pipeline.stage_fingerprint(spec, hash_cache)
+
+    assert run_pipeline.stage_fingerprint(make_spec(tmp_path, {'sample': 500}), hash_cache) != base
+
+    with open(spec['code'][0], 'a') as f:
+        f.write('y = 2\n')
+    changed_code = run_pipeline.stage_fingerprint(spec, hash_cache)
+    assert changed_code != base
+
+    with open(spec['inputs'][0], 'a') as f:
+        f.write('bad,Dashen Bank\n')
+    assert run_pipeline.stage_fingerprint(spec, hash_cache) != changed_code
+
+
+def test_unchanged_stage_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    spec = make_spec(tmp_path)
+    calls = []
+    monkeypatch.setattr(run_pipeline, 'stage_spec', lambda stage, args: spec)
+    monkeypatch.setitem(run_pipeline.STAGE_FUNCTIONS, 'clean',
+                        lambda df, args: calls.append(df))
+    args = SimpleNamespace()
+
+    first = run_pipeline.run_pipeline(['clean'], args)
+    second = run_pipeline.run_pipeline(['clean'], args)
+    forced = run_pipeline.run_pipeline(['clean'], args, force=True)
+
+    assert [t[3] for t in first + second + forced] == ['ok', 'cached', 'ok']
+    assert len(calls) == 2
+
+
+def local_imports(path):
+    """Modules from scripts/ imported by a script, and by those modules in turn"""
+    found, pending = set(), [path]
+    while pending:
+        with open(pending.pop()) as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            names = ([alias.name for alias in node.names] if isinstance(node, ast.Import)
+                     else [node.module] if isinstance(node, ast.ImportFrom) else [])
+            for name in names:
+                module_path = os.path.join(run_pipeline.SCRIPTS_DIR, f"{name}.py")
+                if name not in found and os.path.exists(module_path):
+                    found.add(name)
+                    pending.append(module_path)
+    return found
+
+
+@pytest.mark.parametrize("stage", ['clean', 'sentiment', 'tokenize', 'thematic', 'load',
+                                   'visualize'])
+def test_stage_code_covers_every_local_module_it_imports(stage):
+    if stage == 'visualize':
+        pytest.importorskip("matplotlib")
+    args = SimpleNamespace(near_duplicates='drop', sample=100, backend='torch',
+                           db_backend='sqlite', trends_from_db=False, chart_format='png', dpi=300)
+    code = run_pipeline.stage_spec(stage, args)['code']
+    modules = {os.path.basename(path)[:-3] for path in code}
+
+    assert local_imports(code[0]) <= modules
+
+
+def test_visualize_outputs_follow_the_chart_format(monkeypatch):
+    monkeypatch.delitem(sys.modules, 'final_visualizations', raising=False)
+    args = SimpleNamespace(trends_from_db=False, chart_format='svg', dpi=72)
+
+    spec = run_pipeline.stage_spec('visualize', args)
+
+    # The fingerprint reads the chart names without importing matplotlib
+    assert 'final_visualizations' not in sys.modules
+    final_visualizations = pytest.importorskip("final_visualizations")
+    assert list(final_visualizations.CHARTS) == run_pipeline.CHART_NAMES
+    assert sorted(spec['outputs']) == sorted(
+        os.path.join(final_visualizations.OUTPUT_DIR, f"{name}.svg")
+        for name in final_visualizations.CHARTS)
+    assert spec['params']['dpi'] == 72
+    assert run_pipeline.stage_fingerprint(spec, {}) != run_pipeline.stage_fingerprint(
+        run_pipeline.stage_spec('visualize', SimpleNamespace(**{**vars(args), 'dpi': 300})), {})
@@ -0,0 +1,260 @@
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("google_play_scraper")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+import dataset_io
+import scrape_reviews
+from google_play_scraper.features.reviews import _ContinuationToken
+
+
+class FakePlayStore:
+    """Local stand-in for the Play endpoint: fixed pages per app, tracks concurrency"""
+
+    def __init__(self, pages_per_app=3, page_size=5, latency=0.01, fail_on_page=None,
+                 fail_app=None):
+        self.pages_per_app = pages_per_app
+        self.page_size = page_size
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.request_times = []
+        self.newest = datetime(2024, 6, 1, 12, 0)
+        self.fail_on_page = fail_on_page
+        self.fail_app = fail_app
+
+    def _enter(self):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.request_times.append(time.monotonic())
+
+    def _exit(self):
+        with self.lock:
+            self.active -= 1
+
+    def app(self, app_id, lang='en', country='us'):
+        self._enter()
+        try:
+            return {'title': app_id}
+        finally:
+            self._exit()
+
+    def reviews(self, app_id, lang, country, sort, count, continuation_token=None):
+        self._enter()
+        try:
+            time.sleep(self.latency)
+            page = 0 if continuation_token is None else continuation_token.token
+            if page == self.fail_on_page and self.fail_app in (None, app_id):
+                raise ConnectionError("connection reset")
+            # Newest first, one review per minute
+            result = [{'reviewId': f"{app_id}-{page}-{i}",
+                       'content': f"review {i}",
+                       'score': 5,
+                       'at': self.newest - timedelta(minutes=page * self.page_size + i)}
+                      for i in range(self.page_size)]
+            next_page = page + 1 if page + 1 < self.pages_per_app else None
+            return result, _ContinuationToken(next_page, lang, country, sort, count, None)
+        finally:
+            self._exit()
+
+
+@pytest.fixture
+def play_store(monkeypatch):
+    store = FakePlayStore()
+    monkeypatch.setattr(scrape_reviews, 'app', store.app)
+    monkeypatch.setattr(scrape_reviews, 'reviews', store.reviews)
+    return store
+
+
+def read_ids(summary):
+    return [review_id for chunk in scrape_reviews.read_partition(summary['path'])
+            for review_id in chunk['reviewId']]
+
+
+def test_scrape_all_fetches_every_page_of_every_combination(play_store, tmp_path):
+    apps = [(f"app.{n}", f"Bank {n}") for n in range(4)]
+    results = scrape_reviews.scrape_all(apps, langs=['en'], countries=['us', 'et'],
+                                        max_workers=3, rate=1000, raw_dir=tmp_path)
+
+    assert len(results) == 8
+    assert all(summary['done'] for summary in results)
+    assert sum(len(read_ids(summary)) for summary in results) == 8 * 3 * 5
+    assert [summary['bank'] for summary in results[::2]] == [bank for _, bank in apps]
+
+
+def test_scrape_all_bounds_concurrency(play_store, tmp_path):
+    apps = [(f"app.{n}", f"Bank {n}") for n in range(6)]
+    scrape_reviews.scrape_all(apps, max_workers=2, rate=1000, raw_dir=tmp_path)
+
+    assert play_store.max_active <= 2
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = scrape_reviews.RateLimiter(rate=50)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.wait()
+
+    # First request goes straight away, the next five wait one interval each
+    assert time.monotonic() - start >= 5 / 50 * 0.9
+
+
+def test_incremental_scrape_stops_at_watermark(play_store, tmp_path):
+    full = scrape_reviews.scrape_all([("app.0", "Bank 0")], rate=1000, raw_dir=tmp_path)
+    full_ids = read_ids(full[0])
+    state = {"app.0:en:us": {'newest_at': (play_store.newest - timedelta(minutes=7)).isoformat(),
+                             'newest_ids': [full_ids[7]]}}
+    play_store.request_times.clear()
+
+    new = scrape_reviews.scrape_all([("app.0", "Bank 0")], rate=1000, state=state,
+                                    raw_dir=tmp_path)
+
+    assert read_ids(new[0]) == full_ids[:7]
+    # app lookup plus the two pages holding the seven new reviews
+    assert len(play_store.request_times) == 3
+
+
+def test_incremental_scrape_without_new_reviews_keeps_watermark(play_store, tmp_path):
+    full = scrape_reviews.scrape_all([("app.0", "Bank 0")], rate=1000, state={},
+                                     raw_dir=tmp_path)
+    state = scrape_reviews.advance_watermarks({}, full)
+
+    new = scrape_reviews.scrape_all([("app.0", "Bank 0")], rate=1000, state=state,
+                                    raw_dir=tmp_path)
+    scrape_reviews.advance_watermarks(state, new)
+
+    assert new[0]['rows'] == 0
+    assert state["app.0:en:us"]["newest_ids"] == ["app.0-0-0"]
+
+
+def test_since_cutoff_limits_first_incremental_scrape(play_store, tmp_path):
+    since = play_store.newest - timedelta(minutes=4)
+    new = scrape_reviews.scrape_all([("app.0", "Bank 0")], rate=1000, since=since,
+                                    raw_dir=tmp_path)
+
+    assert new[0]['rows'] == 5
+
+
+def test_interrupted_scrape_resumes_mid_app(play_store, tmp_path):
+    play_store.fail_on_page = 2
+    crashed = scrape_reviews.scrape_all([("app.0", "Bank 0")], rate=1000, raw_dir=tmp_path)
+
+    assert not crashed[0]['done']
+    assert crashed[0]['rows'] == 10
+
+    play_store.fail_on_page = None
+    play_store.request_times.clear()
+    resumed = scrape_reviews.scrape_all([("app.0", "Bank 0")], rate=1000, resume=True,
+                                        raw_dir=tmp_path)
+
+    assert resumed[0]['done']
+    assert len(set(read_ids(resumed[0]))) == 15
+    # app lookup plus only the missing last page
+    assert len(play_store.request_times) == 2
+
+
+def test_export_reviews_writes_finished_partitions(play_store, tmp_path):
+    apps = [(f"app.{n}", f"Bank {n}") for n in range(2)]
+    summaries = scrape_reviews.scrape_all(apps, rate=1000, raw_dir=tmp_path)
+    output = tmp_path / 'bank_reviews.csv'
+
+    counts = scrape_reviews.export_reviews(summaries, output)
+
+    df = scrape_reviews.pd.read_csv(output)
+    assert list(df.columns) == ['review', 'rating', 'date', 'bank', 'source']
+    assert len(df) == 30
+    assert counts.to_dict() == {'Bank 0': 15, 'Bank 1': 15}
+
+
+def test_exported_reviews_are_the_raw_dataset_the_pipeline_reads(play_store, tmp_path):
+    summaries = scrape_reviews.scrape_all([("app.0", "Bank 0")], rate=1000, raw_dir=tmp_path)
+    output = str(tmp_path / 'data' / 'bank_reviews.csv')
+
+    scrape_reviews.export_reviews(summaries, output)
+
+    assert scrape_reviews.OUTPUT_FILE == dataset_io.RAW_REVIEWS
+    df = dataset_io.read_dataset(output)
+    assert len(df) == 15
+    assert df['bank'].dtype == 'category'
+
+
+def test_incremental_run_after_full_scrape_appends_nothing_old(play_store, tmp_path):
+    paths = {'output_path': str(tmp_path / 'bank_reviews.csv'),
+             'state_path': str(tmp_path / 'scrape_state.json'),
+             'raw_dir': str(tmp_path / 'raw')}
+    full = scrape_reviews.run_scrape(rate=1000, **paths)
+    assert full.sum() == 3 * 15
+
+    # The full scrape recorded watermarks, so the incremental run stops on
+    # the first page of each app and the CSV is left as it was
+    play_store.request_times.clear()
+    nothing_new = scrape_reviews.run_scrape(rate=1000, incremental=True, **paths)
+
+    # Nothing new is a successful run with empty counts, not a failure
+    assert nothing_new is not None and nothing_new.sum() == 0
+    assert len(scrape_reviews.pd.read_csv(paths['output_path'])) == 3 * 15
+    assert len(play_store.request_times) == 3 * 2
+
+    play_store.fail_on_page = 0
+    assert scrape_reviews.run_scrape(rate=1000, incremental=True, **paths) is None
+
+
+def test_continuation_token_round_trips_through_json(tmp_path):
+    token = _ContinuationToken("abc", "en", "us", scrape_reviews.Sort.NEWEST, 100, None)
+    path = str(tmp_path / 'checkpoint.json')
+    scrape_reviews.save_checkpoint({'token': scrape_reviews.token_fields(token)}, path)
+
+    restored = scrape_reviews.restore_token(scrape_reviews.load_checkpoint(path)['token'])
+
+    assert isinstance(restored, _ContinuationToken)
+    assert (restored.token, restored.sort, restored.count) == ("abc", scrape_reviews.Sort.NEWEST, 100)
+    # Tokens from another library version (or the old plain-string format) are not trusted
+    assert scrape_reviews.restore_token({'token': "abc", 'page': 2}) is None
+    assert scrape_reviews.restore_token("abc") is None
+
+
+def test_resume_restarts_partition_with_an_unrecognised_token(play_store, tmp_path):
+    play_store.fail_on_page = 2
+    scrape_reviews.scrape_all([("app.0", "Bank 0")], rate=1000, raw_dir=tmp_path)
+    checkpoint_path = scrape_reviews.partition_path("app.0", "en", "us", tmp_path) + '.checkpoint.json'
+    checkpoint = scrape_reviews.load_checkpoint(checkpoint_path)
+    checkpoint['token'] = checkpoint['token']['token']
+    scrape_reviews.save_checkpoint(checkpoint, checkpoint_path)
+
+    play_store.fail_on_page = None
+    play_store.request_times.clear()
+    resumed = scrape_reviews.scrape_all([("app.0", "Bank 0")], rate=1000, resume=True,
+                                        raw_dir=tmp_path)
+
+    assert resumed[0]['done']
+    assert len(set(read_ids(resumed[0]))) == len(read_ids(resumed[0])) == 15
+    # app lookup plus all three pages again
+    assert len(play_store.request_times) == 4
+
+
+def test_resumed_incremental_run_does_not_export_partitions_twice(play_store, tmp_path):
+    paths = {'output_path': str(tmp_path / 'bank_reviews.csv'),
+             'state_path': str(tmp_path / 'scrape_state.json'),
+             'raw_dir': str(tmp_path / 'raw')}
+    since = play_store.newest - timedelta(minutes=7)
+    play_store.fail_on_page = 1
+    play_store.fail_app = scrape_reviews.app_ids['dashen']
+
+    first = scrape_reviews.run_scrape(rate=1000, since=since, **paths)
+    assert first.sum() == 2 * 8
+
+    play_store.fail_on_page = None
+    resumed = scrape_reviews.run_scrape(rate=1000, since=since, resume=True, **paths)
+
+    # Only the partition that was unfinished is appended on resume
+    assert resumed.to_dict() == {'Dashen Bank': 8}
+    assert len(scrape_reviews.pd.read_csv(paths['output_path'])) == 3 * 8
@@ -0,0 +1,186 @@
+import math
+import os
+import sys
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("transformers")
+pytest.importorskip("tqdm")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+import sentiment_analysis
+
+
+class StubClassifier:
+    """Labels reviews by keyword without a model; fails any batch holding a poisoned text"""
+
+    def __init__(self, poison="POISON"):
+        self.poison = poison
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        if any(self.poison in text for text in texts):
+            raise RuntimeError("index out of range in self")
+        return [('NEGATIVE' if 'crash' in text else 'POSITIVE', 0.9) for text in texts]
+
+
+class StubScorer:
+    """Stand-in for make_scorer: records every review sent to the model, can crash once"""
+
+    def __init__(self, crash_on_call=None):
+        self.crash_on_call = crash_on_call
+        self.calls = []
+        self.classifier = StubClassifier()
+
+    def __call__(self, workers=1, token_budget=None, backend='torch'):
+        def score(texts, timings):
+            self.calls.append(list(texts))
+            if len(self.calls) == self.crash_on_call:
+                raise KeyboardInterrupt
+            return [result + (None,) for result in self.classifier(texts)]
+        return score, lambda: None
+
+
+def test_cache_key_ignores_case_and_whitespace_but_not_the_model():
+    key = sentiment_analysis.cache_key("Great  app\n")
+
+    assert key == sentiment_analysis.cache_key("great app")
+    assert key != sentiment_analysis.cache_key("great app!")
+    assert key != sentiment_analysis.cache_key(
+        "great app", revision=sentiment_analysis.backend_revision('int8'))
+    assert key != sentiment_analysis.cache_key("great app", model_name="another-model")
+
+
+def test_token_batches_fit_the_budget_and_skip_untokenized_rows():
+    lengths = [5, None, 3, 40, 4, 2, 3, 12]
+
+    batches = sentiment_analysis.build_token_batches(lengths, token_budget=12)
+
+    assert sorted(i for batch in batches for i in batch) == [0, 2, 3, 4, 5, 6, 7]
+    for batch in batches:
+        widths = [lengths[i] for i in batch]
+        # A review longer than the budget still gets a batch of its own
+        assert max(widths) * len(batch) <= 12 or len(batch) == 1
+        assert widths == sorted(widths)
+
+
+def test_bisect_isolates_the_reviews_that_fail(monkeypatch):
+    monkeypatch.setattr(sentiment_analysis, 'score_token_batch',
+                        lambda input_ids, classifier, timings=None: classifier(input_ids))
+    classifier = StubClassifier()
+    texts = ["great app", "app crash", "POISON", "fast transfer", "crash again", "POISON too",
+             "love it", "ok"]
+    results = [None] * len(texts)
+
+    sentiment_analysis.score_batch_bisect(list(range(len(texts))), texts, classifier, results)
+
+    assert [result[0] for result in results] == [
+        'POSITIVE', 'NEGATIVE', 'FAILED', 'POSITIVE', 'NEGATIVE', 'FAILED', 'POSITIVE', 'POSITIVE']
+    assert math.isnan(results[2][1])
+    assert results[2][2] == "RuntimeError: index out of range in self"
+    assert all(result[2] is None for i, result in enumerate(results) if i not in (2, 5))
+    # Good reviews are scored once; only batches holding a poisoned text get split
+    scored = [text for batch in classifier.batches
+              if not any("POISON" in text for text in batch) for text in batch]
+    assert sorted(scored) == sorted(text for text in texts if "POISON" not in text)
+
+
+def test_streaming_resumes_from_the_last_checkpointed_chunk(monkeypatch, tmp_path):
+    input_path = str(tmp_path / 'cleaned.csv')
+    output_path = str(tmp_path / 'sentiment.csv')
+    cache_path = str(tmp_path / 'cache.csv')
+    pd.DataFrame({'review': [f"app crash {i}" if i % 3 == 0 else f"great app {i}"
+                             for i in range(25)],
+                  'rating': [1] * 25,
+                  'date': ['2024-01-01'] * 25,
+                  'bank': ['Dashen Bank', 'Bank of Abyssinia'] * 12 + ['Dashen Bank']}
+                 ).to_csv(input_path, index=False)
+
+    crashing = StubScorer(crash_on_call=2)
+    monkeypatch.setattr(sentiment_analysis, 'make_scorer', crashing)
+    with pytest.raises(KeyboardInterrupt):
+        sentiment_analysis.analyze_streaming(output_path, chunk_size=10, cache_path=cache_path,
+                                             input_path=input_path)
+
+    checkpoint = sentiment_analysis.load_checkpoint(output_path + '.checkpoint.json')
+    assert (checkpoint['chunks_done'], checkpoint['rows_done']) == (1, 10)
+
+    resumed = StubScorer()
+    monkeypatch.setattr(sentiment_analysis, 'make_scorer', resumed)
+    counts = sentiment_analysis.analyze_streaming(output_path, chunk_size=10,
+                                                  cache_path=cache_path, input_path=input_path)
+
+    # Only the two unfinished chunks are read and scored again
+    assert [len(texts) for texts in resumed.calls] == [10, 5]
+    assert not os.path.exists(output_path + '.checkpoint.json')
+    df = pd.read_csv(output_path)
+    assert df['review'].tolist() == pd.read_csv(input_path)['review'].tolist()
+    assert counts.sum() == 25
+    assert counts.groupby(level='sentiment_label').sum().to_dict() == {'NEGATIVE': 9,
+                                                                      'POSITIVE': 16}
+    assert len(sentiment_analysis.load_sentiment_cache(cache_path)) == 25
+
+
+def test_cache_index_looks_up_only_the_requested_keys(tmp_path):
+    cache_path = str(tmp_path / 'cache.csv')
+    sentiment_analysis.save_sentiment_cache({'a': ('POSITIVE', 0.9), 'b': ('NEGATIVE', 0.8)},
+                                            cache_path)
+    index = sentiment_analysis.open_cache_index(cache_path)
+
+    assert sentiment_analysis.lookup_cache_index(index, ['b', 'x', 'b']) == {'b': ('NEGATIVE', 0.8)}
+
+    # Rows appended to the CSV are indexed on the next sync
+    sentiment_analysis.save_sentiment_cache({'c': ('POSITIVE', 0.7)}, cache_path)
+    sentiment_analysis.sync_cache_index(index, cache_path)
+    keys = [f"k{i}" for i in range(1200)] + ['a', 'c']
+    assert sentiment_analysis.lookup_cache_index(index, keys) == {'a': ('POSITIVE', 0.9),
+                                                                   'c': ('POSITIVE', 0.7)}
+    index.close()
+
+    # A replaced CSV is indexed again from the start
+    os.remove(cache_path)
+    sentiment_analysis.save_sentiment_cache({'d': ('NEGATIVE', 0.6)}, cache_path)
+    index = sentiment_analysis.open_cache_index(cache_path)
+    assert sentiment_analysis.lookup_cache_index(index, ['d']) == {'d': ('NEGATIVE', 0.6)}
+    index.close()
+
+
+def test_worker_pool_leaves_the_parent_environment_unchanged(monkeypatch):
+    started = []
+
+    class FakeContext:
+        def Pool(self, workers, initializer, initargs):
+            started.append({var: os.environ.get(var) for var in ('OMP_NUM_THREADS',
+                                                                 'TOKENIZERS_PARALLELISM')})
+            return 'pool'
+
+    monkeypatch.setattr(sentiment_analysis.multiprocessing, 'get_context',
+                        lambda method: FakeContext())
+    monkeypatch.setattr(sentiment_analysis.os, 'cpu_count', lambda: 8)
+    monkeypatch.setenv('OMP_NUM_THREADS', '16')
+    monkeypatch.delenv('TOKENIZERS_PARALLELISM', raising=False)
+
+    assert sentiment_analysis.start_worker_pool(4) == 'pool'
+
+    # Workers are spawned with the capped settings, the parent keeps its own
+    assert started == [{'OMP_NUM_THREADS': '2', 'TOKENIZERS_PARALLELISM': 'false'}]
+    assert os.environ['OMP_NUM_THREADS'] == '16'
+    assert 'TOKENIZERS_PARALLELISM' not in os.environ
+
+
+def test_missing_text_is_scored_as_an_empty_review_in_process_and_in_workers(tmp_path):
+    assert sentiment_analysis.cache_key(float('nan')) == sentiment_analysis.cache_key('')
+    assert sentiment_analysis.cache_key(None) == sentiment_analysis.cache_key('')
+
+    scorer = StubScorer()
+    score, _ = scorer()
+    df = pd.DataFrame({'review': ["great app", None, float('nan')]})
+    sentiment_analysis.score_dataframe(df, {}, score, cache_path=str(tmp_path / 'cache.csv'))
+
+    # The model sees the same '' the worker corpus stores for missing text
+    assert scorer.calls == [["great app", ""]]
+    corpus_path = str(tmp_path / 'corpus')
+    sentiment_analysis.write_corpus(df, corpus_path)
+    assert list(sentiment_analysis.ReviewCorpus(corpus_path).texts(1, 3)) == ["", ""]
@@ -0,0 +1,141 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+sparse = pytest.importorskip("scipy.sparse")
+pytest.importorskip("sklearn")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+import thematic_analysis
+
+
+def test_top_keywords_matches_dense_scoring():
+    matrix = sparse.random(500, 60, density=0.05, format='csr', random_state=1)
+    names = np.array([f"term{i}" for i in range(60)])
+
+    dense = sorted(zip(names, np.mean(matrix.toarray(), axis=0)),
+                   key=lambda x: x[1], reverse=True)[:10]
+    top = thematic_analysis.top_keywords(matrix, names, 10)
+
+    assert [name for name, _ in top] == [name for name, _ in dense]
+    assert np.allclose([score for _, score in top], [score for _, score in dense])
+
+
+def test_top_keywords_breaks_ties_in_vocabulary_order():
+    matrix = sparse.csr_matrix(np.array([[1.0, 2.0, 2.0, 0.0]]))
+    names = np.array(['a', 'b', 'c', 'd'])
+
+    assert [name for name, _ in thematic_analysis.top_keywords(matrix, names, 3)] == ['b', 'c', 'a']
+    assert len(thematic_analysis.top_keywords(matrix, names, 10)) == 4
+
+
+def test_shared_corpus_matches_separate_vectorizers():
+    pd = pytest.importorskip("pandas")
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    rng = np.random.default_rng(3)
+    words = np.array("app bank transfer slow login crash money otp update service "
+                     "customer balance error password account failed payment".split())
+    reviews = [' '.join(rng.choice(words, rng.integers(3, 10))) for _ in range(300)]
+    df = pd.DataFrame({'review': reviews,
+                       'bank': rng.choice(['Dashen Bank', 'Bank of Abyssinia'], 300),
+                       'sentiment_label': 'NEGATIVE'})
+    corpus = thematic_analysis.build_corpus(df)
+
+    tfidf, columns = thematic_analysis.select_tfidf(corpus.counts, max_features=30,
+                                                    min_df=3, max_df=0.8)
+    vectorizer = TfidfVectorizer(max_features=30, stop_words='english', ngram_range=(1, 2),
+                                 min_df=3, max_df=0.8)
+    expected = vectorizer.fit_transform(reviews)
+
+    assert list(corpus.feature_names[columns]) == list(vectorizer.get_feature_names_out())
+    assert np.allclose(tfidf.toarray(), expected.toarray())
+
+    rows = np.flatnonzero(corpus.banks == 'Dashen Bank')
+    tfidf, columns = thematic_analysis.select_tfidf(corpus.counts, rows=rows, max_features=10)
+    vectorizer = TfidfVectorizer(max_features=10, stop_words='english', ngram_range=(1, 2))
+    expected = vectorizer.fit_transform([reviews[i] for i in rows])
+
+    assert list(corpus.feature_names[columns]) == list(vectorizer.get_feature_names_out())
+    assert np.allclose(tfidf.toarray(), expected.toarray())
+
+
+def negative_reviews(n, seed):
+    pd = pytest.importorskip("pandas")
+    themes = [["login", "otp", "password", "account", "locked"],
+              ["transfer", "money", "failed", "transaction", "balance"],
+              ["crash", "update", "error", "bug", "freeze"],
+              ["customer", "service", "support", "call", "response"]]
+    rng = np.random.default_rng(seed)
+    reviews = [' '.join(rng.choice(themes[rng.integers(4)], rng.integers(3, 8)))
+               + f" ref{rng.integers(10**6)}" for _ in range(n)]
+    return pd.DataFrame({'review': reviews, 'bank': 'Dashen Bank',
+                         'sentiment_label': 'NEGATIVE'})
+
+
+def test_topic_model_updates_with_new_reviews_only(tmp_path):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("joblib")
+    model_path = str(tmp_path / 'topic_model.joblib')
+    first = negative_reviews(2000, seed=1)
+
+    topics = thematic_analysis.topic_modeling_analysis(first, model_path=model_path)
+    state = thematic_analysis.load_topic_model(model_path)
+    assert state['reviews'] == 2000
+    assert len(topics) == 4
+
+    # Nothing new: topics come straight from the stored model
+    assert thematic_analysis.topic_modeling_analysis(first, model_path=model_path) == topics
+
+    both = pd.concat([first, negative_reviews(300, seed=2)], ignore_index=True)
+    updated = thematic_analysis.topic_modeling_analysis(both, model_path=model_path)
+    assert thematic_analysis.load_topic_model(model_path)['reviews'] == 2300
+    # Topic IDs keep their meaning across updates
+    for name, words in topics.items():
+        assert set(words[:3]) & set(updated[name][:5])
+
+
+def test_too_few_negatives_still_leave_a_topic_model_file(tmp_path):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("joblib")
+    model_path = str(tmp_path / 'topic_model.joblib')
+    few = negative_reviews(10, seed=3)
+
+    assert thematic_analysis.topic_modeling_analysis(few, model_path=model_path) == {}
+    assert os.path.exists(model_path)
+    assert thematic_analysis.load_topic_model(model_path) is None
+
+    # The placeholder is replaced once there are enough reviews to fit
+    more = pd.concat([few, negative_reviews(200, seed=4)], ignore_index=True)
+    assert len(thematic_analysis.topic_modeling_analysis(more, model_path=model_path)) == 4
+    assert thematic_analysis.load_topic_model(model_path)['reviews'] == 210
+
+
+def test_seen_filter_remembers_every_added_review():
+    rng = np.random.default_rng(5)
+    added, other = rng.integers(0, 2 ** 63, size=(2, 5000), dtype=np.int64).astype(np.uint64)
+    seen = np.zeros(thematic_analysis.SEEN_BITS // 8, dtype=np.uint8)
+
+    thematic_analysis.mark_seen(seen, added)
+
+    assert thematic_analysis.is_seen(seen, added).all()
+    assert thematic_analysis.is_seen(seen, other).mean() < 0.001
+
+
+def test_term_map_keeps_the_most_frequent_terms_per_column(monkeypatch):
+    from collections import Counter
+    monkeypatch.setattr(thematic_analysis, 'TOPIC_FEATURES', 4)
+    state = {'terms': {}}
+
+    thematic_analysis.count_terms(state, Counter({f"term{i}": i for i in range(1, 41)}))
+    thematic_analysis.count_terms(state, Counter({'term1': 100}))
+
+    assert len(state['terms']) <= 4 * thematic_analysis.TERMS_PER_COLUMN
+    by_column = {}
+    for term, (column, count) in state['terms'].items():
+        by_column[column] = max(by_column.get(column, ('', 0)), (term, count), key=lambda x: x[1])
+    # term1 was dropped after the first update, so it counts again from zero
+    assert by_column[state['terms']['term1'][0]] == ('term1', 100)
+    assert ('term40', 40) in by_column.values()
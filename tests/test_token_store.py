@@ -0,0 +1,76 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("sklearn")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+import thematic_analysis
+import token_store
+
+
+def test_update_tokenizes_only_new_reviews_and_keeps_ids(tmp_path, make_reviews):
+    path = str(tmp_path / 'store')
+    first = make_reviews(200, seed=1)
+    store = token_store.update_token_store(first, path)
+    rows = token_store.store_rows(store, first)
+    before = token_store.ngram_counts(store, rows).toarray()
+    vocab = list(store.vocab)
+
+    both = pd.concat([first, make_reviews(100, seed=2), first.head(10)], ignore_index=True)
+    store = token_store.update_token_store(both, path)
+
+    assert len(store.digests) == len(np.unique(token_store.review_digests(both)))
+    assert store.vocab[:len(vocab)] == vocab
+    after = token_store.ngram_counts(store, token_store.store_rows(store, first)).toarray()
+    assert np.array_equal(after[:, :before.shape[1]], before)
+    assert isinstance(store.token_ids, np.memmap)
+
+    with pytest.raises(KeyError):
+        token_store.store_rows(store, make_reviews(5, seed=3))
+
+
+def test_store_backed_analyses_match_tokenizing_the_text(tmp_path, make_reviews):
+    df = make_reviews(400, seed=4)
+    df.loc[0, 'review'] = None
+    store = token_store.update_token_store(df, str(tmp_path / 'store'))
+
+    expected = thematic_analysis.build_corpus(df)
+    corpus = thematic_analysis.build_corpus(df, store)
+    assert list(corpus.feature_names) == list(expected.feature_names)
+    assert (corpus.counts != expected.counts).nnz == 0
+
+    negative = df[df['sentiment_label'] == 'NEGATIVE']
+    X, terms = thematic_analysis.topic_features(negative, store)
+    expected_X, expected_terms = thematic_analysis.topic_features(negative)
+    assert np.allclose(X.toarray(), expected_X.toarray())
+    assert terms == expected_terms
+
+
+def test_updates_append_only_new_rows_and_drop_uncommitted_bytes(tmp_path, make_reviews):
+    path = str(tmp_path / 'store')
+    first = make_reviews(50, seed=5)
+    token_store.update_token_store(first, path)
+    digests = os.path.join(path, 'digests.bin')
+    before = open(digests, 'rb').read()
+
+    # Nothing new: no file is written again
+    mtime = os.stat(digests).st_mtime_ns
+    token_store.update_token_store(first, path)
+    assert os.stat(digests).st_mtime_ns == mtime
+
+    # Bytes left behind by an interrupted update are not part of the store
+    with open(digests, 'ab') as f:
+        f.write(b'\xff' * 24)
+    assert len(token_store.load_token_store(path).digests) == len(before) // 8
+
+    both = pd.concat([first, make_reviews(30, seed=6)], ignore_index=True)
+    store = token_store.update_token_store(both, path)
+    assert open(digests, 'rb').read().startswith(before)
+    assert len(store.digests) == len(np.unique(token_store.review_digests(both)))
+    expected = thematic_analysis.build_corpus(both)
+    corpus = thematic_analysis.build_corpus(both, store)
+    assert (corpus.counts != expected.counts).nnz == 0